@@ -0,0 +1,5 @@
+"""Turn-throughput benchmarks for roguelike."""
+from src import benchmark
+
+if __name__ == "__main__":
+    benchmark.main()
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 import tcod
 from . import config
 from . import components
+from . import navigation
 from . import stages
 from .config import States
 
@@ -136,11 +137,8 @@ class PickupAction(Action):
         stage = kwargs['stage']
         entity = kwargs['entity']
 
-        # todo: Move this functionality to stage....
-        for e in stage.entities:
-            item_pos_at_our_pos = e.x == entity.x and e.y == entity.y
-
-            if e.has_comp('item') and item_pos_at_our_pos:
+        for e in stage.entities_at(entity.x, entity.y):
+            if e.has_comp('item'):
                 # Add to entity's inventory
                 success = entity.inv.add_item(e)
 
@@ -343,30 +341,29 @@ class StairUpAction(Action):
 
         stage = dungeon.get_stage()
 
-        for entity in stage.entities:
-            if entity.has_comp('stair_up'):
-                hero_at_stairs = entity.x == entity.x and entity.y == entity.y
-                if hero_at_stairs:
+        for entity in stage.with_comp('stair_up'):
+            hero_at_stairs = entity.x == entity.x and entity.y == entity.y
+            if hero_at_stairs:
 
-                    if dungeon.current_stage == 0:
+                if dungeon.current_stage == 0:
 
-                        return ActionResult(
-                            success=False,
-                            alt=LeaveGameAction(),
-                            msg='You go up the stairs and leave the dungeon forever...',
-                            new_state=States.HERO_DEAD
-                        )
+                    return ActionResult(
+                        success=False,
+                        alt=LeaveGameAction(),
+                        msg='You go up the stairs and leave the dungeon forever...',
+                        new_state=States.HERO_DEAD
+                    )
 
-                    elif dungeon.move_upstairs():
-                        stage = dungeon.get_stage()
-                        game.redraw = True
+                elif dungeon.move_upstairs():
+                    game.stage = dungeon.get_stage()
+                    game.redraw = True
 
-                        return ActionResult(
-                            success=True,
-                            msg='You ascend the stairs up.'
-                        )
-                    else:
-                        raise ValueError("Something weird happened with going upstairs!")
+                    return ActionResult(
+                        success=True,
+                        msg='You ascend the stairs up.'
+                    )
+                else:
+                    raise ValueError("Something weird happened with going upstairs!")
 
         return ActionResult(
             success=False,
@@ -381,23 +378,20 @@ class StairDownAction(Action):
         game = kwargs['game']
         stage = dungeon.get_stage()
 
-        for entity in stage.entities:
-            if entity.has_comp('stair_down'):
-                hero_at_stairs = entity.x == entity.x and entity.y == entity.y
-
-                if hero_at_stairs:
-                    dungeon.mk_next_stage()
+        for entity in stage.with_comp('stair_down'):
+            hero_at_stairs = entity.x == entity.x and entity.y == entity.y
 
-                    if dungeon.move_downstairs():
-                        stage = dungeon.get_stage()
-                        stage.populate()
-                        game.redraw = True
-                        return ActionResult(
-                            success=True,
-                            msg='You carefully descend the stairs down.',
-                        )
-                    else:
-                        raise ValueError("Something weird happened with going downstairs!")
+            if hero_at_stairs:
+                # The stage below is made if it doesn't exist yet.
+                if dungeon.move_downstairs():
+                    game.stage = dungeon.get_stage()
+                    game.redraw = True
+                    return ActionResult(
+                        success=True,
+                        msg='You carefully descend the stairs down.',
+                    )
+                else:
+                    raise ValueError("Something weird happened with going downstairs!")
 
         return ActionResult(
             success=False,
@@ -681,52 +675,12 @@ class MoveAStarAction(Action):
         self.target = target
 
     def perform(self, *args, **kwargs):
-        # Create a FOV map that has the dimensions of the map
-        # DeprecationWarning: Call tcod.map.Map(width, height) instead.
-        # fov = tcod.map_new(self.stage.width, self.stage.height)
-
-        fov = tcod.map.Map(width=self.stage.width, height=self.stage.height)
-
-        # Scan the current map each turn and set all the walls as unwalkable
-        for y1 in range(self.stage.height):
-            for x1 in range(self.stage.width):
-                # DeprecationWarning: Set properties using the m.transparent and m.walkable arrays.
-                # tcod.map_set_properties( fov, x1, y1, not self.stage.tiles[x1][y1].block_sight, not self.stage.tiles[x1][y1].blocks)
-
-                fov.transparent[y1, x1] = not self.stage.tiles[x1][y1].block_sight
-                fov.walkable[y1, x1] = not self.stage.tiles[x1][y1].blocks
-
-        # Scan all the objects to see if there are objects that must be navigated
-        # around. Check also that the object isn't self or the target (so that
-        # the start and the end points are free). The AI class handles the
-        # situation if self is next to the target so it will not use this A* function
-        # anyway
-
-        for entity in self.stage.entities:
-            if entity.blocks and entity != self and entity != self.target:
-                # Set the tile as a wall so it must be navigated around
-                # tcod.map_set_properties(fov, entity.x, entity.y, True, False)
-
-                fov.walkable[entity.y, entity.x] = False
-
-        # Allocate a A* path
-        # The 1.41 is the normal diagonal cost of moving, it can be set as 0.0
-        # if diagonal moves are prohibited
-
-        # PendingDeprecationWarning: This function may be deprecated in the future.
-        my_path = tcod.path_new_using_map(m=fov, dcost=1.41)
-
-        # Compute the path between self's coordinates and the target's coordinates
-
-        # PendingDeprecationWarning: This function may be deprecated in the future.
-        # Returns a boolean...
-        tcod.path_compute(
-            p=my_path,
-            ox=self.entity.x,
-            oy=self.entity.y,
-            dx=self.target.x,
-            dy=self.target.y
-        )
+        # The stage keeps a cached cost map of the terrain - other blocking
+        # entities are marked on a copy of it so they get navigated around.
+        # Self and the target are left free so the start and end points are
+        # walkable. The AI class handles the situation if self is next to the
+        # target so it will not use this A* function anyway.
+        path = self.stage.nav.get_path(self.entity, self.target)
 
         # Check if the path exists, and in this case, also the path is shorter
         # than 25 tiles. The path size matters if you want the monster to use
@@ -734,39 +688,50 @@ class MoveAStarAction(Action):
         # example the player is in a corridor. It makes sense to keep path size
         # relatively low to keep the monsters from running around the map if
         # there's an alternative path really far away
-
-        # PendingDeprecationWarning: This function may be deprecated in the future.
-        print(tcod.path_size(my_path))
-        print(my_path)
-
-        if not tcod.path_is_empty(my_path) and tcod.path_size(my_path) < 25:
-
+        if path and len(path) < navigation.MAX_PATH_LEN:
             # Find the next coordinates in the computed full path
+            x, y = path[0]
 
-            # PendingDeprecationWarning: This function may be deprecated in the future.
-            x, y = tcod.path_walk(my_path, True)
-            if x or y:
+            # Set self's coordinates to the next path tile
+            dx, dy = self.stage.calc_dxdy(self.entity.x, self.entity.y, x, y)
 
-                # Set self's coordinates to the next path tile
-                dx, dy = self.stage.calc_dxdy(self.entity.x, self.entity.y, x, y)
-                print(dx, dy)
-
-                # DeprecationWarning: libtcod objects are deleted automatically.
-                # tcod.path_delete(my_path)
-
-                return ActionResult(
-                    success=True,
-                    alt=WalkAction(dx, dy)
-                )
+            return ActionResult(
+                success=True,
+                alt=WalkAction(dx, dy)
+            )
 
         # Keep the old move function as a backup so that if there are no paths
         # (for example another monster blocks a corridor) it will still try to
         # move towards the player (closer to the corridor opening)
-        # self.move_towards(self.target.x, self.target.y, self.stage)
+        return ActionResult(
+            success=True,
+            alt=MoveTowardAction(self.stage, self.entity, self.target)
+        )
+
+
+class MoveFlowAction(Action):
+    def __init__(self, stage, entity, target):
+        super().__init__(consumes_turn=True)
+        self.stage = stage
+        self.entity = entity
+        self.target = target
 
-        # DeprecationWarning: libtcod objects are deleted automatically.
-        # tcod.path_delete(my_path)
+    def perform(self, *args, **kwargs):
+        """Steps downhill on the target's flow field. The field is shared by
+            every entity approaching the same target, so this is a neighbour
+            lookup instead of a path search.
+        """
+        step = self.stage.nav.descend(self.entity, self.target)
+
+        if step:
+            dx, dy = step
+            return ActionResult(
+                success=True,
+                alt=WalkAction(dx, dy)
+            )
 
+        # No downhill step (blocked in, or too far away) - fall back on just
+        # heading toward the target.
         return ActionResult(
             success=True,
             alt=MoveTowardAction(self.stage, self.entity, self.target)
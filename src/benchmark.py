@@ -0,0 +1,258 @@
+""" Turn-throughput benchmarks for the game loop.
+    Each scenario builds a seeded game, runs it headless for a number of turns
+    with the hero waiting (or taking the stairs down), and times every
+    Engine.actor_turn. A second, traced run measures allocations with
+    tracemalloc. Results are plain dicts, ready to dump as JSON.
+
+    Usage: python bench.py [--seed N] [--turns N] [--scenario NAME ...] [--out FILE]
+"""
+import argparse
+import json
+import logging
+import math
+import platform
+import random
+import time
+import tracemalloc
+import numpy as np
+from . import actions
+from . import config
+from . import engine
+from . import factory
+from . import fov
+from . import game
+from . import headless
+from . import hero_input
+from . import stages
+from .config import States
+from .rect import Rect
+
+DEFAULT_SEED = 1234
+DEFAULT_TURNS = 200
+
+# Enough hp that no scenario can kill the hero while it stands around.
+HERO_HP = 10 ** 9
+
+
+class TimedEngine(engine.Engine):
+    """Engine that records how long every actor's turn took."""
+    def __init__(self, _game, render_eng, hero_input=None):
+        super().__init__(_game, render_eng, hero_input=hero_input, autosave=False)
+        self.actor_times = []
+        self.turn_times = {}
+        self.actions = 0
+
+    def actor_turn(self, actor):
+        turn = self.g.turns
+        start = time.perf_counter()
+        super().actor_turn(actor)
+        elapsed = time.perf_counter() - start
+
+        self.actor_times.append(elapsed)
+        self.turn_times[turn] = self.turn_times.get(turn, 0) + elapsed
+
+    def process_action(self, action, entity):
+        self.actions += 1
+        super().process_action(action, entity)
+
+
+def wait_policy(g):
+    if g.state != States.PLAYING:
+        return actions.ExitAction(state=g.state)
+    return actions.WaitAction()
+
+
+def descend_policy(g):
+    """Stands the hero on the down stairs and takes them, every turn."""
+    if g.state != States.PLAYING:
+        return actions.ExitAction(state=g.state)
+
+    stair = g.stage.find_stair('>')
+    g.hero.x, g.hero.y = stair.x, stair.y
+    return actions.StairDownAction()
+
+
+def free_tiles(stage):
+    """Returns a list of the (x, y) floor tiles with nothing on them."""
+    floor = np.argwhere(~stage.tiles.blocks)
+    return [(int(x), int(y)) for x, y in floor if not stage.is_occupied(x, y)]
+
+
+def spawn(stage, entity_name, amt):
+    """Places up to amt of the entity on random free tiles. Returns how many
+        were placed - a small stage can run out of room.
+    """
+    spots = free_tiles(stage)
+    random.shuffle(spots)
+
+    for x, y in spots[:amt]:
+        stage.entities.append(factory.mk_entity(entity_name, x, y))
+
+    return min(amt, len(spots))
+
+
+def clear_stage(g):
+    """Removes everything but the hero and the stairs."""
+    keep = (g.hero, g.stage.find_stair('<'), g.stage.find_stair('>'))
+    g.stage.entities = [e for e in g.stage.entities if e in keep]
+
+
+def open_stage(g, amt):
+    """ Swaps the hero's stage for one open room with the hero and stairs in
+        it, and twice the floor amt more entities need - so they all fit and
+        monsters still have room to move. The room is the size of a normal
+        stage, or bigger if that is too small.
+    """
+    floor = (config.stage_width - 2) * (config.stage_height - 2)
+    scale = max(1.0, math.sqrt(2 * (amt + 3) / floor))
+    width = math.ceil(config.stage_width * scale)
+    height = math.ceil(config.stage_height * scale)
+
+    stage = stages.Stage(width, height, rng=random.Random(g.dungeon.stage_seed(1)))
+    room = Rect(0, 0, width, height)
+    stage.dig_room(room)
+    stage.rooms.append(room)
+    stage.place_stairs_up(1, 1)
+    stage.place_stairs_down(width - 2, height - 2)
+
+    g.hero.x, g.hero.y = room.center()
+    stage.entities.append(g.hero)
+
+    g.dungeon.stages[g.dungeon.current_stage] = stage
+    g.stage = stage
+    g.fov_map = fov.initialize_fov(stage)
+    g.fov_recompute = True
+    return stage
+
+
+def setup_empty(g):
+    clear_stage(g)
+    return wait_policy
+
+
+def setup_monsters(amt):
+    def setup(g):
+        spawn(open_stage(g, amt), 'orc', amt)
+        return wait_policy
+    return setup
+
+
+def setup_items(g):
+    spawn(open_stage(g, 500), 'healing_potion', 500)
+    return wait_policy
+
+
+def setup_descend(g):
+    return descend_policy
+
+
+SCENARIOS = {
+    'empty': setup_empty,
+    'monsters_10': setup_monsters(10),
+    'monsters_100': setup_monsters(100),
+    'monsters_1000': setup_monsters(1000),
+    'items': setup_items,
+    'descend': setup_descend,
+}
+
+
+def mk_game(scenario, seed):
+    """Returns a seeded game set up for the scenario, and the hero's policy."""
+    random.seed(seed)
+    g = game.Game(seed=seed)
+    g.hero.fighter.base_max_hp = g.hero.fighter.hp = HERO_HP
+
+    policy = SCENARIOS[scenario](g)
+    return g, policy
+
+
+def play(scenario, seed, turns):
+    g, policy = mk_game(scenario, seed)
+    eng = TimedEngine(g, headless.NullRenderEngine(), hero_input.PolicyInput(policy))
+    entities = len(g.stage.entities)
+
+    # Reseed so the run itself doesn't depend on how much setup used.
+    random.seed(seed)
+    eng.play_game(max_turns=turns)
+    return eng, entities
+
+
+def percentiles(samples, scale):
+    if not samples:
+        return {}
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {
+        'p50': round(p50 * scale, 3),
+        'p90': round(p90 * scale, 3),
+        'p99': round(p99 * scale, 3),
+        'max': round(max(samples) * scale, 3),
+    }
+
+
+def run_scenario(scenario, seed=DEFAULT_SEED, turns=DEFAULT_TURNS, allocs=True):
+    """Runs one scenario and returns its results as a dict."""
+    start = time.perf_counter()
+    eng, entities = play(scenario, seed, turns)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'scenario': scenario,
+        'entities': entities,
+        'turns': eng.g.turns,
+        'actions': eng.actions,
+        'seconds': round(elapsed, 4),
+        'turns_per_sec': round(eng.g.turns / elapsed, 2) if elapsed else None,
+        'turn_ms': percentiles(list(eng.turn_times.values()), 1000),
+        'actor_turn_us': percentiles(eng.actor_times, 1000000),
+    }
+
+    if allocs:
+        tracemalloc.start()
+        play(scenario, seed, turns)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result['alloc_net_kib'] = round(current / 1024, 1)
+        result['alloc_peak_kib'] = round(peak / 1024, 1)
+
+    return result
+
+
+def run(scenarios=None, seed=DEFAULT_SEED, turns=DEFAULT_TURNS, allocs=True):
+    """Runs the scenarios (all of them by default) with the engine's logging
+        turned down, and returns the report as a dict.
+    """
+    level = engine.log.level
+    engine.log.setLevel(logging.WARNING)
+
+    try:
+        results = [run_scenario(s, seed, turns, allocs) for s in scenarios or SCENARIOS]
+    finally:
+        engine.log.setLevel(level)
+
+    return {
+        'seed': seed,
+        'turns': turns,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scenarios': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Turn-throughput benchmarks.')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--turns', type=int, default=DEFAULT_TURNS)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    parser.add_argument('--no-allocs', action='store_true', help='Skip the tracemalloc run.')
+    parser.add_argument('--out', help='Write the JSON report to this file.')
+    args = parser.parse_args(argv)
+
+    report = run(args.scenario, args.seed, args.turns, not args.no_allocs)
+    output = json.dumps(report, indent=2)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
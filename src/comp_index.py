@@ -0,0 +1,56 @@
+# Component names the stage keeps a live set of entities for.
+INDEXED_COMPS = ('ai', 'human', 'item', 'fighter', 'stair_up', 'stair_down')
+
+# Entities with any of these components take turns.
+ACTOR_COMPS = ('ai', 'human')
+
+
+class ComponentIndex(object):
+    """ Live sets of the entities on a stage that have a given component, so
+        finding all the actors or stairs doesn't mean checking every entity.
+        Dicts are used as ordered sets - iterating one follows the order the
+        entities were filed in. Entities that take turns are also filed under
+        'actor'.
+        actor_version changes whenever an entity joins or leaves the actors.
+    """
+    def __init__(self):
+        self.sets = {name: {} for name in INDEXED_COMPS + ('actor',)}
+        self.actor_version = 0
+
+    def add(self, e):
+        for name in INDEXED_COMPS:
+            if name in e.components:
+                self.sets[name][e] = None
+
+        if any(name in e.components for name in ACTOR_COMPS):
+            self.sets['actor'][e] = None
+            self.actor_version += 1
+
+    def remove(self, e):
+        if e in self.sets['actor']:
+            self.actor_version += 1
+
+        for entities in self.sets.values():
+            entities.pop(e, None)
+
+    def update(self, e):
+        """Re-files an entity after a component was added or removed."""
+        for name in INDEXED_COMPS:
+            if name in e.components:
+                self.sets[name].setdefault(e, None)
+            else:
+                self.sets[name].pop(e, None)
+
+        actor = any(name in e.components for name in ACTOR_COMPS)
+
+        if actor != (e in self.sets['actor']):
+            self.actor_version += 1
+
+        if actor:
+            self.sets['actor'].setdefault(e, None)
+        else:
+            self.sets['actor'].pop(e, None)
+
+    def get(self, name):
+        """Returns a list of the entities filed under the component name."""
+        return list(self.sets[name])
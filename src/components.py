@@ -1,4 +1,3 @@
-from random import randint
 from . import actions
 from . import config
 from .config import Slots
@@ -61,7 +60,8 @@ class ApproachAI(object):
             # if stages.Stage.distance_between_entities(self.owner, g.hero) >= 2:
 
             if self.owner.distance_to(g.hero) >= 2:
-                return actions.MoveAStarAction(g.stage, self.owner, g.hero)
+                # All approaching monsters share one distance map to the hero.
+                return actions.MoveFlowAction(g.stage, self.owner, g.hero)
 
                 # self.owner.move_astar(g.hero, g.stage)
 
@@ -92,8 +92,9 @@ class ConfusedBehavior(object):
         results = []
 
         if self.num_turns > 0:
-            random_x = self.owner.x + randint(0, 2) - 1
-            random_y = self.owner.y + randint(0, 2) - 1
+            # Stumble about with the stage's random numbers.
+            random_x = self.owner.x + game_map.rng.randint(0, 2) - 1
+            random_y = self.owner.y + game_map.rng.randint(0, 2) - 1
 
             if random_x != self.owner.x and random_y != self.owner.y:
                 self.owner.move_towards(random_x, random_y, game_map)
@@ -249,3 +250,10 @@ class EnergyMeter(object):
 
     def burned_out(self):
         return self.energy < self.threshold
+
+    def turns_until_ready(self, amt):
+        """Returns how many turns of gaining amt energy it takes to reach the
+            threshold (at least 1).
+        """
+        need = self.threshold - self.energy
+        return max(1, -(-need // amt))
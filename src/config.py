@@ -65,6 +65,17 @@ room_min_len = 3
 NW_OFFSET = 1
 SE_OFFSET = 2
 max_rooms = 10
+
+# Make the next stage down in a background process while the hero explores
+# the current one, so taking the stairs doesn't wait on level generation.
+# engine.main turns this on for the interactive game. It's off otherwise
+# (tests, headless runs, the benchmark) - the worker is a spawned process,
+# which imports the caller's __main__ again.
+pregen_stages = False
+
+# Most stages kept in memory. Past this, the stages visited least recently are
+# written out to a temp file until the hero goes back to them.
+max_loaded_stages = 8
 max_items_weights = [[1, 1], [2, 4]]
 
 # Monster data
@@ -92,6 +103,13 @@ fov_radius = 5                # How far can we see?
 
 energy_per_turn = 100
 
+# Most frames per second drawn, for the menu and the game. 0 means no cap.
+max_fps = 0
+
+# Frames per second drawn while monsters act. At 0, a frame is only drawn right
+# before the hero acts.
+anim_fps = 0
+
 colors = {
     # 'dark_wall': tcod.Color(0, 0, 100),
     # 'dark_ground': tcod.Color(50, 50, 150),
@@ -1,45 +1,219 @@
-import shelve
+""" Saving and loading games.
+    A save file is a small header (magic, format version and the offset of the
+    game record) followed by:
+        per stage:
+          tile planes  - each tile_dt field as a bit-packed NumPy array.
+          entities     - the pickled entity list. Entities pickle as their
+                         component dicts, and the hero is stored once in the
+                         game record and referenced from its stage.
+        game record    - length-prefixed, pickled dict of the hero, message
+                         log, game state and the layout of every stage (size,
+                         depth, rooms and where its tiles and entities are).
+    Loading memory-maps the file and only builds the current stage. The other
+    stages stay in the file as SavedStages until the hero goes to them, so
+    loading takes as long no matter how deep the hero has gone.
+    Derived state - the fov map, the stage indexes and caches - is not saved,
+    it is rebuilt on load. Older format versions are upgraded on load by the
+    functions in MIGRATIONS.
+    Note: the entities, hero and message log are still pickled objects - the
+    components (Fighter, ApproachAI, Inventory, item functions and so on) are
+    stored by their module and class names. Renaming or moving one of those
+    breaks existing saves unless a migration maps the old name to the new.
+"""
 import os
+import pickle
+import struct
+import numpy as np
+from . import dungeon
 from . import game
+from .rng import RNG
+from .stage_store import (
+    UNPICKLE_ERRORS, SavedStage, check_pickle, stage_bytes, stage_record, write_block
+)
 
-# Flags
-# r: read-only
-# w: open for reading and writing
-# n: delete old and write new file
-# c: open for reading adn writing, but also create new file if it DNE
+MAGIC = b'RLSV'
+VERSION = 1
 
-# Protocols
-# By default the call to shelve.open() uses the oldest, least efficient version.
-# ensures that it will be the most widely supported
-# For more efficiency, pass the integer 2 for this parameter (the versions are
-# currently 0, 1, and 2). Or if you have "import pickle" in your script, you can
-# pass pickle.HIGHEST_PROTOCOL and this will always use the latest version of the
-# pickling protocol. But be warned, earlier versions of Python may not be able to
-# read the shelf files produced by later versions of Python running your game script.
+HEADER = struct.Struct('<4sH')      # magic, format version
+INDEX = struct.Struct('<Q')         # offset of the game record
+SECTION = struct.Struct('<I')       # length of the section that follows
+
+# Every game record has these
+RECORD_KEYS = (
+    'hero', 'msg_log', 'state', 'prev_state', 'turns', 'targeting_item',
+    'action_queue', 'current_stage', 'stages',
+)
+
+# And every stage in it has these
+STAGE_KEYS = ('width', 'height', 'dungeon_lvl', 'rooms', 'tiles', 'entities')
+
+
+def read_block(data, offset, size):
+    if offset < 0 or size < 0 or offset + size > len(data):
+        raise ValueError('Save file is truncated.')
+    return data[offset:offset + size]
+
+
+def unpickle_record(buf):
+    """ Returns the game record pickled in buf. Raises ValueError if it can't
+        be unpickled or is missing any of the RECORD_KEYS.
+    """
+    check_pickle(buf)
+
+    try:
+        record = pickle.loads(buf)
+    except UNPICKLE_ERRORS as err:
+        raise ValueError('Save file is damaged: {}'.format(err)) from err
+
+    if not isinstance(record, dict) or any(k not in record for k in RECORD_KEYS):
+        raise ValueError('Save file is damaged: the game record is incomplete.')
+
+    return record
 
 
 def save_game(filepath, game):
-    with shelve.open(filepath, 'n') as data_file:
-        data_file['hero'] = game.hero
-        data_file['dungeon'] = game.dungeon
-        data_file['stage'] = game.stage
-        data_file['msg_log'] = game.msg_log
-        data_file['state'] = game.state
-        data_file['prev_state'] = game.prev_state
-        data_file['turns'] = game.turns
-        data_file['targeting_item'] = game.targeting_item
-        data_file['action_queue'] = game.action_queue
-        data_file['fov_recompute'] = game.fov_recompute
-        data_file['fov_map'] = game.fov_map
-        data_file['redraw'] = game.redraw
+    """ Writes the game to filepath. The file is written next to the old save
+        and swapped in at the end, so a failed save leaves the old one intact.
+    """
+    temp_path = filepath + '.tmp'
+    infos = []
+
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION))
+        f.write(INDEX.pack(0))
+
+        for stage in game.dungeon.stages:
+            tile_buf, entity_buf = stage_bytes(stage, game.hero)
+
+            info = stage_record(stage)
+            info['tiles'] = write_block(f, tile_buf)
+            info['entities'] = write_block(f, entity_buf)
+            infos.append(info)
+
+        record = {
+            'hero': game.hero,
+            'msg_log': game.msg_log,
+            'state': game.state,
+            'prev_state': game.prev_state,
+            'turns': game.turns,
+            'targeting_item': game.targeting_item,
+            'action_queue': game.action_queue,
+            'current_stage': game.dungeon.current_stage,
+            'seed': game.dungeon.rng.seed,
+            'stages': infos,
+        }
+
+        record_offset = f.tell()
+        record_buf = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        f.write(SECTION.pack(len(record_buf)))
+        f.write(record_buf)
+
+        f.seek(HEADER.size)
+        f.write(INDEX.pack(record_offset))
+
+    # Stages still in the old save are mapped from it, and a mapped file can't
+    # be replaced on every OS. Copy them into memory until the new save is in
+    # place, then map them from that.
+    source = os.path.abspath(filepath)
+    stage_list = game.dungeon.stages
+    mapped = [
+        i for i, stage in enumerate(stage_list)
+        if isinstance(stage, SavedStage) and stage.source == source
+    ]
+
+    for i in mapped:
+        stage = stage_list[i]
+        stage_list[i] = SavedStage(stage.info, bytes(stage.tile_buf), bytes(stage.entity_buf), game.hero)
+
+    os.replace(temp_path, filepath)
+
+    if mapped:
+        data = np.memmap(filepath, dtype=np.uint8, mode='r')
+
+        for i in mapped:
+            info = infos[i]
+            stage_list[i] = SavedStage(
+                info, read_block(data, *info['tiles']), read_block(data, *info['entities']),
+                game.hero, source
+            )
+
+
+def read_save(filepath):
+    """ Reads the header and game record of a save file. Returns
+        (version, record, stage_data), where stage_data is a list of
+        (tiles, entities) buffers, one per stage. The buffers are views into
+        the memory-mapped file, so stage data is only read when it's used.
+    """
+    if os.path.getsize(filepath) < HEADER.size:
+        raise ValueError('Not a save file.')
+
+    data = np.memmap(filepath, dtype=np.uint8, mode='r')
+    magic, version = HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise ValueError('Not a save file.')
+
+    if version > VERSION:
+        raise ValueError('Save file version {} is newer than this game.'.format(version))
+
+    record_offset, = INDEX.unpack_from(read_block(data, HEADER.size, INDEX.size))
+    record_size, = SECTION.unpack_from(read_block(data, record_offset, SECTION.size))
+    record = unpickle_record(read_block(data, record_offset + SECTION.size, record_size))
+
+    stage_data = []
+
+    try:
+        for info in record['stages']:
+            if any(k not in info for k in STAGE_KEYS):
+                raise ValueError('Save file is damaged: the stage index is incomplete.')
+
+            stage_data.append(
+                (read_block(data, *info['tiles']), read_block(data, *info['entities']))
+            )
+    except TypeError as err:
+        raise ValueError('Save file is damaged: {}'.format(err)) from err
+
+    return version, record, stage_data
+
+
+# Upgrades for older saves: MIGRATIONS[v] takes the game record and stage data
+# (as returned by read_save) of format version v and returns them in v + 1.
+MIGRATIONS = {}
+
+
+def migrate(version, record, stage_data):
+    """Upgrades a decoded save from its format version to the current one."""
+    while version < VERSION:
+        if version not in MIGRATIONS:
+            raise ValueError('Save file version {} can not be loaded.'.format(version))
+
+        record, stage_data = MIGRATIONS[version](record, stage_data)
+        version += 1
+
+    return record, stage_data
 
 
 def load_game(filepath):
-    if os.path.exists(filepath):
-        with shelve.open(filepath, 'r') as data_file:
-            _game = game.Game()
-            _game.load_game(data_file)
-        return _game
-
-    # Could not find file
-    return None
+    """ Returns the game saved at filepath, or None if there is no save.
+        Only the stage the hero is on is built, the rest are SavedStages.
+        Raises ValueError if the file is not a save this game can read.
+    """
+    if not os.path.exists(filepath):
+        # Could not find file
+        return None
+
+    version, record, stage_data = read_save(filepath)
+    record, stage_data = migrate(version, record, stage_data)
+
+    hero = record['hero']
+    source = os.path.abspath(filepath)
+    stage_list = [
+        SavedStage(info, tile_buf, entity_buf, hero, source)
+        for info, (tile_buf, entity_buf) in zip(record['stages'], stage_data)
+    ]
+
+    record['dungeon'] = dungeon.Dungeon.restore(
+        hero, stage_list, record['current_stage'], RNG(record.get('seed'))
+    )
+
+    return game.Game.restore(record)
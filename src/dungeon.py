@@ -1,12 +1,92 @@
+import atexit
+import multiprocessing
+import random
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from . import config
 from . import stages
+from .rng import RNG, PLAY, STAGE
+from .stage_store import SpillFile
+
+# The worker process stages are made on ahead of time, started on first use.
+# If it can't be started or dies, stages are made in this process instead.
+pool = None
+pool_broken = False
+
+
+def get_pool():
+    """ Returns the worker pool, or None if stages can't be made in the
+        background (turned off in config, or no process support).
+    """
+    global pool
+
+    if pool_broken or not config.pregen_stages:
+        return None
+
+    if pool is None:
+        try:
+            # A fresh interpreter - it doesn't inherit any of our state.
+            ctx = multiprocessing.get_context('spawn')
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+        except (OSError, NotImplementedError):
+            pool_failed()
+            return None
+
+    return pool
+
+
+def shutdown_pool():
+    """Stops the worker process, dropping any stage it was still making."""
+    global pool
+
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def pool_failed():
+    """Stops using the worker pool - stages are made in this process from now on."""
+    global pool_broken
+    pool_broken = True
+
+
+def generate_stage(width, height, depth, seed):
+    """ Makes and populates a stage. The same arguments always make the same
+        stage, whether it's run here or in the worker process.
+    """
+    stage = stages.Stage(width, height, depth, rng=random.Random(seed))
+    stage.mk_stage()
+    stage.populate()
+    return stage
 
 
 class Dungeon(object):
-    def __init__(self, hero):
+    """ The stages of the dungeon, by depth (stages[0] is depth 1).
+        Stages are made the first time they're needed and kept after that.
+        Only config.max_loaded_stages of them are kept in memory - the ones
+        visited least recently are spilled to a temp file, and loaded back in
+        when the hero returns.
+    """
+    def __init__(self, hero, rng=None):
         self.hero = hero
         self.stages = []
 
+        # Every stage is made from its own stream of the game's RNG.
+        self.rng = rng or RNG()
+
+        # Stages being made in the background, by depth.
+        self.pending = {}
+
+        # Indexes of the stages in memory, least recently used first, the file
+        # the others are spilled to, and the indexes of those in it.
+        self.loaded = OrderedDict()
+        self.spill_file = None
+        self.spilled = set()
+
         # Note: Can we fix this with a property? To match up with Stages?
         self.current_stage = 0
 
@@ -16,7 +96,49 @@ class Dungeon(object):
         hero_start_x, hero_start_y = self.stages[0].rooms[0].center()
         self.move_hero(0, hero_start_x, hero_start_y)
 
-        self.get_stage().populate()
+    @classmethod
+    def restore(cls, hero, stage_list, current_stage, rng=None):
+        """ Returns a Dungeon of already made stages, without generating any.
+            The stages can be Stages, or stand-ins with a load() method that
+            returns the Stage (like stage_store.SavedStage).
+        """
+        d = cls.__new__(cls)
+        d.hero = hero
+        d.stages = stage_list
+        d.rng = rng or RNG()
+        d.pending = {}
+        d.loaded = OrderedDict(
+            (i, True) for i, stage in enumerate(stage_list) if isinstance(stage, stages.Stage)
+        )
+        d.spill_file = None
+        d.spilled = set()
+        d.current_stage = current_stage
+        return d
+
+    def stage_seed(self, depth):
+        return self.rng.derive(depth, STAGE)
+
+    def pregen_next_stage(self):
+        """ Starts making the stage below the current one in the worker
+            process, if it doesn't exist yet. mk_next_stage picks it up.
+        """
+        depth = len(self.stages) + 1
+
+        if depth != self.current_stage + 2 or depth in self.pending:
+            return
+
+        workers = get_pool()
+        if workers is None:
+            return
+
+        try:
+            self.pending[depth] = workers.submit(
+                generate_stage,
+                config.stage_width, config.stage_height, depth, self.stage_seed(depth)
+            )
+        except (BrokenProcessPool, RuntimeError):
+            # The worker died (or is shutting down) - make stages here.
+            pool_failed()
 
     # def current_lvl(self):
         # Find the hero and return the level the hero is on.
@@ -24,23 +146,82 @@ class Dungeon(object):
     def get_stage(self):
         # todo: Returns the specified stage, otherwise returns the stage the
         # hero is currently on
-        return self.stages[self.current_stage]
+        return self.stage_at(self.current_stage)
+
+    def stage_at(self, index):
+        """ Returns the stage at index. Stages below the deepest one made so
+            far are made first, and stages on disk are loaded back in.
+        """
+        while index >= len(self.stages):
+            self.mk_next_stage()
+
+        stage = self.stages[index]
+
+        if not isinstance(stage, stages.Stage):
+            saved = stage
+            stage = self.stages[index] = saved.load()
+            stage.rng = self.rng.stream(index + 1, PLAY)
+
+            if index in self.spilled:
+                # It'll be spilled again from scratch, its old copy is garbage.
+                self.spilled.discard(index)
+                self.spill_file.release(saved)
+
+        self.touch(index)
+        return stage
+
+    def touch(self, index):
+        """Marks the stage at index as just used, and makes room for it."""
+        if index in self.loaded:
+            self.loaded.move_to_end(index)
+            return
+
+        self.loaded[index] = True
+        self.evict(keep=index)
+
+    def evict(self, keep=None):
+        """Spills the least recently used stages until few enough are loaded."""
+        for index in list(self.loaded):
+            if len(self.loaded) <= config.max_loaded_stages:
+                break
+
+            if index in (keep, self.current_stage):
+                continue
+
+            if self.spill_file is None:
+                self.spill_file = SpillFile()
+
+            self.stages[index] = self.spill_file.spill(self.stages[index], self.hero)
+            self.spilled.add(index)
+            del self.loaded[index]
 
     def mk_next_stage(self):
-        # todo: Does this work no matter what stage the hero is at?
-        # todo: What if we run it 10x in a row?
-        # Generate next dungeon level
+        # Generate next dungeon level - or take it from the worker if it's
+        # already been started there.
         level_depth = len(self.stages) + 1
-        new_stage = stages.Stage(config.stage_width, config.stage_height, level_depth)
-        new_stage.mk_stage()
+        new_stage = None
+        future = self.pending.pop(level_depth, None)
+
+        if future is not None:
+            try:
+                new_stage = future.result()
+            except BrokenProcessPool:
+                pool_failed()
+
+        if new_stage is None:
+            new_stage = generate_stage(
+                config.stage_width, config.stage_height,
+                level_depth, self.stage_seed(level_depth)
+            )
+
         self.stages.append(new_stage)
+        self.touch(len(self.stages) - 1)
 
     def hero_at_stairs(self, stair_char):
-        for e in self.get_stage().entities:
-            if stair_char == '>' and e.has_comp('stair_down'):
-                return e.x == self.hero.x and e.y == self.hero.y
-            if stair_char == '<' and e.has_comp('stair_up'):
-                return e.x == self.hero.x and e.y == self.hero.y
+        stair_comp = 'stair_down' if stair_char == '>' else 'stair_up'
+
+        for e in self.get_stage().with_comp(stair_comp):
+            return e.x == self.hero.x and e.y == self.hero.y
         return False
 
     def move_downstairs(self):
@@ -53,7 +234,7 @@ class Dungeon(object):
 
         if self.hero.x == down_stair.x and self.hero.y == down_stair.y:
             stage_index = self.current_stage + 1
-            next_stage = self.stages[stage_index]
+            next_stage = self.stage_at(stage_index)
 
             hero_start_x, hero_start_y = next_stage.rooms[0].center()
             return self.move_hero(stage_index, hero_start_x, hero_start_y)
@@ -70,7 +251,7 @@ class Dungeon(object):
 
         if self.hero.x == up_stair.x and self.hero.y == up_stair.y:
             next_lvl = self.current_stage - 1
-            hero_start_x, hero_start_y = self.stages[next_lvl].rooms[-1].center()
+            hero_start_x, hero_start_y = self.stage_at(next_lvl).rooms[-1].center()
             return self.move_hero(next_lvl, hero_start_x, hero_start_y)
 
         return False
@@ -88,29 +269,33 @@ class Dungeon(object):
         # Does the destination level exist??
 
         # Is it a wall?
-        src_stage = self.stages[dest_stage_index]
-        if src_stage.tiles[dest_x][dest_y].blocks:
+        dest_stage = self.stage_at(dest_stage_index)
+        if dest_stage.blocks(dest_x, dest_y):
             return False
 
-        # Is there a blocking monster there?
-        blockers = [e for e in src_stage.entities if e.blocks]
-        for e in blockers:
-            if e.x == dest_x and e.y == dest_y:
-                return False
+        # Is there a blocking monster there? (The hero can't block itself.)
+        blocker = dest_stage.get_blocker_at_loc(dest_x, dest_y)
+        if blocker and blocker is not self.hero:
+            return False
 
         # Search for the hero(If not found - that is ok.)
         # If found, keep current location
 
-        # Remove the hero
-        src_stage.rm_hero()
-
-        # Place the hero at the destination
-        self.stages[dest_stage_index].entities.append(self.hero)
+        # Remove the hero from the stage they are leaving, so its index doesn't
+        # keep them filed at their old spot.
+        self.get_stage().rm_hero()
+        dest_stage.rm_hero()
 
         # Update hero x/y
         self.hero.x, self.hero.y = dest_x, dest_y
 
+        # Place the hero at the destination
+        dest_stage.entities.append(self.hero)
+
         # Update current_lvl
         self.current_stage = dest_stage_index
 
+        # Get the next stage down going while the hero is on this one.
+        self.pregen_next_stage()
+
         return True
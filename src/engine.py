@@ -1,12 +1,16 @@
+import time
 import tcod
 from . import config
+from . import dungeon
 from . import game
 from . import logger
 from . import render_functions
 from .config import States
 from .data_loaders import load_game, save_game
 from .fov import initialize_fov, recompute_fov
-from .input_handling import handle_main_menu, process_tcod_input
+from .hero_input import TcodInput
+from .scheduler import Scheduler
+from .input_handling import MouseState, handle_main_menu, process_tcod_event
 
 log = logger.setup_logger()
 
@@ -14,95 +18,155 @@ log = logger.setup_logger()
 def main():
     log.debug('Started new game.')
 
+    # Make stages ahead of time in a worker process while the game is played.
+    config.pregen_stages = True
+
+    try:
+        run_menu()
+    finally:
+        dungeon.shutdown_pool()
+
+
+def run_menu():
     render_eng = render_functions.RenderEngine()
-    show_main_menu = True
     show_load_err_msg = False
     main_menu_bg_img = tcod.image_load(filename=config.menu_img)
-
-    key = tcod.Key()
-    mouse = tcod.Mouse()
+    frame_cap = FrameCap(config.max_fps)
 
     while True:
-        # todo: This runs all the time! Make it wait...
+        # The menu is only drawn when something changed - in between, the loop
+        # sleeps in wait_for_menu_key until there is input.
+        render_eng.render_main_menu(main_menu_bg_img)
 
-        # Deprecated since version 9.3: Use the tcod.event.get function to check for events.
-        tcod.sys_check_for_event(
-            mask=tcod.EVENT_KEY_PRESS | tcod.EVENT_MOUSE,
-            k=key,
-            m=mouse
-        )
+        if show_load_err_msg:
+            render_eng.render_msg_box('No save game to load', 50)
 
-        # When I can re-arrange input after rendering - re-enable this...
-        # tcod.sys_wait_for_event(
-            # mask=tcod.EVENT_KEY_PRESS | tcod.EVENT_MOUSE,
-            # k=key,
-            # m=mouse,
-            # flush=True
-        # )
+        # Update the display to represent the root consoles current state.
+        frame_cap.wait()
+        render_eng.flush()
 
-        if show_main_menu:
-            render_eng.render_main_menu(main_menu_bg_img)
+        key_char = wait_for_menu_key()
 
-            if show_load_err_msg:
-                render_eng.render_msg_box('No save game to load', 50)
+        if key_char is None:
+            # The window was exposed - copy the cached menu to it again.
+            continue
 
-            # Update the display to represent the root consoles current state.
-            tcod.console_flush()
+        if key_char == 'resize':
+            # The window was resized - draw the menu from scratch.
+            render_eng.invalidate_menu()
+            continue
 
-            key_char = process_tcod_input(key)
-            action = handle_main_menu(state=None, key=key_char)
+        if key_char == 'alt-enter':
+            tcod.console_set_fullscreen(fullscreen=not tcod.console_is_fullscreen())
+            render_eng.invalidate_menu()
+            continue
 
-            new_game = action.get('new_game')
-            load_saved_game = action.get('load_game')
-            exit_game = action.get('exit')
-            options = action.get('options')
+        action = handle_main_menu(state=None, key=key_char)
 
-            if show_load_err_msg and (new_game or load_saved_game or exit_game):
-                show_load_err_msg = False
-            elif new_game:
-                log.debug('New game selected.')
-                _game = game.Game()
+        new_game = action.get('new_game')
+        load_saved_game = action.get('load_game')
+        exit_game = action.get('exit') or key_char == 'quit'
+        options = action.get('options')
 
-                show_main_menu = False
+        if show_load_err_msg and (new_game or load_saved_game or exit_game):
+            show_load_err_msg = False
+        elif new_game:
+            log.debug('New game selected.')
+            play(game.Game(), render_eng)
 
-            elif load_saved_game:
-                log.debug('Load game selected.')
+        elif load_saved_game:
+            log.debug('Load game selected.')
+            try:
                 _game = load_game(config.savefile)
+            except ValueError as err:
+                # An old or damaged save - treat it like there is none.
+                log.warning('Could not load {}: {}'.format(config.savefile, err))
+                _game = None
+
+            if _game:
+                play(_game, render_eng)
+            else:
+                show_load_err_msg = True
+
+        elif options:
+            # todo: Fill out options menu
+            log.debug('Options selected - STUB!')
+
+        elif exit_game:
+            log.debug('Exit selected')
+            break
+
+
+def play(_game, render_eng):
+    # Reset a console to its default colors and the space character.
+    render_eng.con.clear()
+    engine = Engine(_game, render_eng)
+    engine.play_game()
+
+
+def wait_for_menu_key():
+    """ Sleeps until the next key press and returns its key string. Returns
+        'quit' if the window was closed, 'resize' if it was resized, or None if
+        it was exposed and needs to be shown again. Other events (like mouse
+        moves or focus changes) are skipped without waking the menu.
+    """
+    while True:
+        for event in tcod.event.wait():
+            if isinstance(event, tcod.event.Quit):
+                return 'quit'
+
+            if isinstance(event, tcod.event.WindowResized):
+                return 'resize'
+
+            if isinstance(event, tcod.event.WindowEvent):
+                if event.type == 'WindowExposed':
+                    return None
+                continue
+
+            key_char = process_tcod_event(event)
+            if key_char:
+                return key_char
+
 
-                if _game:
-                    show_main_menu = False
-                else:
-                    show_load_err_msg = True
+class FrameCap(object):
+    """Keeps frames at least 1/fps seconds apart. An fps of 0 means no cap."""
+    def __init__(self, fps):
+        self.fps = fps
+        self.last = 0
 
-            elif options:
-                # todo: Fill out options menu
-                log.debug('Options selected - STUB!')
+    def wait(self):
+        if self.fps:
+            delay = self.last + 1 / self.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
 
-            elif exit_game:
-                log.debug('Exit selected')
-                break
-        else:
-            # Reset a console to its default colors and the space character.
-            render_eng.con.clear()
-            engine = Engine(_game, render_eng)
-            engine.play_game()
-            show_main_menu = True
+        self.last = time.perf_counter()
 
 
 class Engine(object):
-    def __init__(self, _game, render_eng):
+    def __init__(self, _game, render_eng, hero_input=None, autosave=True):
         self.g = _game
         # self.g.fov_recompute = True
         self.g.redraw = True
 
         self.render_eng = render_eng
-        self.key = tcod.Key()
-        self.mouse = tcod.Mouse()
+        self.mouse = MouseState()
+        self.frame_cap = FrameCap(config.max_fps)
+
+        # Where the hero's actions come from - the keyboard/mouse by default.
+        self.hero_input = hero_input or TcodInput(self.mouse)
+        self.autosave = autosave
+
+        self.scheduler = Scheduler(now=self.g.turns)
+
+        # Where the fov was last computed from, and when the last frame was drawn.
+        self.fov_pos = None
+        self.last_frame = 0
 
         self.activate_main_menu = False
 
 
-    def play_game(self):
+    def play_game(self, max_turns=None):
         log.debug('Calling play_game...')
 
         # Deprecated since version 9.3: Use the tcod.event module to check for "QUIT" type events.
@@ -115,41 +179,58 @@ class Engine(object):
 
         # Change to while not dead or main menu?
         while True:
-            for e in self.get_actors():
-                log.info('Turn: %s: %s', self.g.turns, e.name)
-                self.actor_turn(e)
+            turn = self.scheduler.peek(self.g.stage)
 
-                # Save and go to main menu
-                if self.g.state == States.MAIN_MENU:
-                    save_game(config.savefile, self.g)
-                    return
+            if turn is None:
+                return
 
-                if self.g.hero.fighter.hp <= 0:
-                    self.player_dead()
-                    # todo: Delete the save game!
-                    return
+            if max_turns is not None and turn >= max_turns:
+                self.g.turns = max(self.g.turns, max_turns)
+                return
 
-                self.g.fov_recompute = True
+            # Only the actor with enough energy to act next is popped.
+            self.g.turns, e = self.scheduler.pop(self.g.stage)
 
-            self.g.turns += 1
+            log.info('Turn: %s: %s', self.g.turns, e.name)
+            self.actor_turn(e)
+            self.scheduler.push(e)
 
-    def get_actors(self):
-        return [e for e in self.g.stage.entities if e.has_comp('ai') or e.has_comp('human')]
+            # Save and go to main menu
+            if self.g.state == States.MAIN_MENU:
+                if self.autosave:
+                    self.scheduler.flush()
+                    save_game(config.savefile, self.g)
+                return
 
-    def actor_turn(self, actor):
-        actor.energymeter.add_energy(config.energy_per_turn)
+            if self.g.hero.fighter.hp <= 0:
+                self.player_dead()
+                # todo: Delete the save game!
+                return
+
+            self.g.fov_recompute = True
 
+    def actor_turn(self, actor):
+        # The scheduler has already added the energy the actor earned.
         while not actor.energymeter.burned_out():
-            # elif actor.get_comp('human'):
-            self.update_rendering()
+            energy = actor.energymeter.energy
 
             if actor.has_comp('ai'):
+                # Monsters act on the world without drawing a frame each.
+                self.update_fov()
+                self.animate()
                 action = actor.ai.get_action(self.g)
             elif actor.has_comp('human'):
-                action = actor.get_action(self.g, self.key, self.mouse)
+                # One frame with all the monsters' moves, right before input.
+                self.update_rendering()
+                action = self.hero_input.get_action(self.g)
 
             self.g.action_queue.put(action)
-            self.resolve_actions(self.g.hero)
+            self.resolve_actions(actor)
+
+            # A monster whose action failed (ie: its step was blocked) waits
+            # instead of asking its AI again forever.
+            if actor.has_comp('ai') and actor.energymeter.energy == energy:
+                actor.energymeter.burn_turn()
 
             if self.g.state == States.MAIN_MENU:
                 return
@@ -158,21 +239,21 @@ class Engine(object):
     def player_dead(self):
         while True:
             self.update_rendering()
-            action = self.g.hero.get_action(self.g, self.key, self.mouse)
+            action = self.hero_input.get_action(self.g)
 
             self.g.action_queue.put(action)
             self.resolve_actions(self.g.hero)
 
-            if self.g.states == States.MAIN_MENU:
+            if self.g.state == States.MAIN_MENU:
                 return
 
     def resolve_actions(self, actor):
-        print('Resolving actions')
+        log.debug('Resolving actions')
 
         # Check the action queue for any remaining actions - use them first
         while not self.g.action_queue.empty():
             action = self.g.action_queue.get()
-            print('\t{}'.format(action))
+            log.debug('\t%s', action)
 
             self.process_action(action=action, entity=actor)
 
@@ -218,9 +299,10 @@ class Engine(object):
                 self.g.action_queue.put(r.alt)
 
 
-    def update_rendering(self):
-        log.info('update_rendering:')
-
+    def update_fov(self):
+        """Brings the fov map up to date with the hero, so monsters deciding
+            what to do see the same fov the hero does. Nothing is drawn.
+        """
         if self.g.redraw:
             log.info('redraw:')
             # Reset the stage
@@ -228,13 +310,15 @@ class Engine(object):
 
             self.g.fov_map = initialize_fov(stage)
             self.g.fov_recompute = True
-            self.render_eng.con.clear()
-            # libtcod.console_clear(con)
+            self.render_eng.invalidate()
 
             self.g.redraw = False
+            self.fov_pos = None
+
+        # The hero's fov only changes when the hero moves.
+        pos = self.g.hero.x, self.g.hero.y
 
-        # Only recompute the fov if its the Players turn.
-        if self.g.fov_recompute:
+        if pos != self.fov_pos:
             log.info('fov_recompute:')
             recompute_fov(
                 self.g.fov_map,
@@ -244,6 +328,15 @@ class Engine(object):
                 config.fov_light_walls,
                 config.fov_algorithm
             )
+            self.fov_pos = pos
+            self.g.fov_recompute = True
+
+    def update_rendering(self):
+        """Composes and presents a frame with everything that happened since
+            the last one.
+        """
+        log.info('update_rendering:')
+        self.update_fov()
 
         # Render all entities
         self.render_eng.render_all(self.g, self.mouse)
@@ -251,7 +344,18 @@ class Engine(object):
         self.g.fov_recompute = False       # Mandatory
 
         # Presents everything on screen
-        tcod.console_flush()
+        self.frame_cap.wait()
+        self.render_eng.flush()
 
         # Clear all entities
-        self.render_eng.clear_all(self.g.stage.entities)
+        self.render_eng.clear_all()
+
+        self.last_frame = time.perf_counter()
+
+    def animate(self):
+        """Renders a frame while monsters act, at most config.anim_fps times a
+            second. With anim_fps at 0 monsters' moves only show up in the frame
+            drawn before the hero's next action.
+        """
+        if config.anim_fps and time.perf_counter() - self.last_frame >= 1 / config.anim_fps:
+            self.update_rendering()
@@ -3,6 +3,9 @@ import tcod
 from . import stages
 from .config import RenderOrder
 
+# Attributes that the stage holding the entity indexes it by.
+INDEXED_ATTRS = ('x', 'y', 'blocks', 'render_order')
+
 
 class Entity(object):
     """ A generic object to represent players, enemies, items, etc.
@@ -28,8 +31,34 @@ class Entity(object):
             # self.components = value
             super().__setattr__('components', value)
         else:
+            new_comp = key not in self.components
             self.components[key] = value
 
+            if key in INDEXED_ATTRS:
+                self.changed()
+            if new_comp:
+                self.comps_changed()
+
+    def watch(self, stage):
+        """Sets the stage that gets told when this entity moves. The stage is
+            kept outside of the components so it isn't pickled with the entity.
+        """
+        super().__setattr__('_stage', stage)
+
+    def unwatch(self, stage):
+        if self.__dict__.get('_stage') is stage:
+            super().__setattr__('_stage', None)
+
+    def changed(self):
+        stage = self.__dict__.get('_stage')
+        if stage is not None:
+            stage.entity_changed(self)
+
+    def comps_changed(self):
+        stage = self.__dict__.get('_stage')
+        if stage is not None:
+            stage.comps_changed(self)
+
     def __getstate__(self):
         """But if we try to pickle our d instance, we get RecursionError because
             of that __getattr__ which does the magic conversion of attribute
@@ -46,6 +75,7 @@ class Entity(object):
     def add_comp(self, **kwargs):
         for k, v in kwargs.items():
             self.components[k] = v
+        self.comps_changed()
 
     def has_comp(self, component):
         if component in self.components:
@@ -55,6 +85,7 @@ class Entity(object):
     def rm_comp(self, component):
         if component in self.components:
             self.components.pop(component)
+            self.comps_changed()
             return True
         return False
 
@@ -65,8 +96,11 @@ class Entity(object):
 
         if dest_x < 0 or dest_y < 0:
             raise ValueError('move cannot place entity in a negative x or y: ({}, {})'.format(dest_x, dest_y))
-        self.x += dx
-        self.y += dy
+
+        # Set both before telling the stage, so it only refiles us once.
+        self.components['x'] = dest_x
+        self.components['y'] = dest_y
+        self.changed()
 
     def distance_to(self, other):
         return stages.Stage.distance_between_entities(self, other)
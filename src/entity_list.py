@@ -0,0 +1,65 @@
+class EntityList(list):
+    """ The list of entities on a stage.
+        It behaves like a normal list, but tells the stage whenever an entity
+        is added or removed so the stage can keep its lookup indexes current.
+    """
+    def __init__(self, stage, entities=()):
+        super().__init__()
+        self.stage = stage
+        self.extend(entities)
+
+    def at(self, x, y):
+        """Returns a list of the entities on the tile."""
+        return self.stage.entities_at(x, y)
+
+    def append(self, e):
+        super().append(e)
+        self.stage.register(e)
+
+    def extend(self, entities):
+        for e in entities:
+            self.append(e)
+
+    def __iadd__(self, entities):
+        self.extend(entities)
+        return self
+
+    def insert(self, i, e):
+        super().insert(i, e)
+        self.stage.register(e)
+
+    def remove(self, e):
+        super().remove(e)
+        self.stage.unregister(e)
+
+    def pop(self, i=-1):
+        e = super().pop(i)
+        self.stage.unregister(e)
+        return e
+
+    def clear(self):
+        while self:
+            self.pop()
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            value = list(value)
+
+        old = self[i]
+        super().__setitem__(i, value)
+
+        for e in (old if isinstance(i, slice) else [old]):
+            self.stage.unregister(e)
+        for e in (value if isinstance(i, slice) else [value]):
+            self.stage.register(e)
+
+    def __delitem__(self, i):
+        old = self[i]
+        super().__delitem__(i)
+
+        for e in (old if isinstance(i, slice) else [old]):
+            self.stage.unregister(e)
+
+    def __reduce__(self):
+        # Pickle as a plain list - the stage rebuilds its EntityList on load.
+        return list, (list(self),)
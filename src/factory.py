@@ -1,3 +1,4 @@
+import random
 import tcod
 from . import components
 from . import item_funcs
@@ -31,13 +32,13 @@ monster_chances = {
 }
 
 
-def rnd_monster(x, y):
-    monster_choice = rnd_choice_from_dict(monster_chances)
+def rnd_monster(x, y, rng=random):
+    monster_choice = rnd_choice_from_dict(monster_chances, rng)
     return mk_entity(monster_choice, x, y)
 
 
-def rnd_item(x, y):
-    item_choice = rnd_choice_from_dict(item_chances)
+def rnd_item(x, y, rng=random):
+    item_choice = rnd_choice_from_dict(item_chances, rng)
     return mk_entity(item_choice, x, y)
 
 
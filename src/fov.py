@@ -4,10 +4,10 @@ import tcod
 def initialize_fov(game_map):
     fov_map = tcod.map.Map(width=game_map.width, height=game_map.height)
 
-    for y in range(game_map.height):
-        for x in range(game_map.width):
-            fov_map.transparent[y, x] = not game_map.tiles[x][y].block_sight
-            fov_map.walkable[y, x] = not game_map.tiles[x][y].blocks
+    # The stage tiles are indexed [x, y] while the fov map is [y, x], so the
+    # planes get transposed once and copied over whole.
+    fov_map.transparent[:] = ~game_map.tiles.block_sight.T
+    fov_map.walkable[:] = ~game_map.tiles.blocks.T
 
     return fov_map
 
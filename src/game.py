@@ -4,15 +4,20 @@ from . import dungeon
 from . import fov
 from . import player
 from .messages import MsgLog
+from .rng import RNG
 
 
 class Game(object):
-    def __init__(self):
+    def __init__(self, seed=None):
+        # Where all of the game's random numbers come from. The same seed
+        # makes the same dungeon.
+        self.rng = RNG(seed)
+
         # Create the hero
         new_hero = player.get_hero()
 
         # Initialize the Dungeon
-        new_dungeon = dungeon.Dungeon(new_hero)
+        new_dungeon = dungeon.Dungeon(new_hero, self.rng)
 
         # Initialize the MsgLog
         msg_log = MsgLog(x=1, width=config.scr_width, height=config.msg_height)
@@ -34,20 +39,30 @@ class Game(object):
         self.fov_map = fov.initialize_fov(self.stage)
         self.redraw = False
 
+    @classmethod
+    def restore(cls, data_file):
+        """ Returns the game saved in data_file. Unlike Game(), no hero or
+            dungeon is generated just to be replaced by the saved ones.
+        """
+        g = cls.__new__(cls)
+        g.load_game(data_file)
+        return g
+
     def load_game(self, data_file):
+        """ Takes over the game saved in data_file (see data_loaders). The fov
+            map isn't saved, it is rebuilt for the current stage.
+        """
         self.hero = data_file['hero']
         self.dungeon = data_file['dungeon']
-        self.stage = data_file['stage']
+        self.rng = self.dungeon.rng
+        self.stage = self.dungeon.get_stage()
         self.msg_log = data_file['msg_log']
         self.state = data_file['state']
         self.prev_state = data_file['prev_state']
         self.turns = data_file['turns']
         self.targeting_item = data_file['targeting_item']
         self.action_queue = data_file['action_queue']
-        self.fov_recompute = data_file['fov_recompute']
-        self.fov_map = data_file['fov_map']
-        self.redraw = data_file['redraw']
 
-        # Fix double hero - on load we have a problem with a copy on the stage
-        self.stage.rm_hero()
-        self.stage.entities.append(self.hero)
+        self.fov_recompute = True
+        self.fov_map = fov.initialize_fov(self.stage)
+        self.redraw = False
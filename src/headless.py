@@ -0,0 +1,37 @@
+""" Running the game loop without a window.
+    NullRenderEngine stands in for RenderEngine - it never opens a tcod root
+    console and throws every frame away, so the loop runs at full speed for
+    tests, simulations and batch jobs.
+"""
+import tcod
+from . import config
+from . import engine
+
+
+class NullRenderEngine(object):
+    """Offscreen render sink with the same interface the Engine uses."""
+    def __init__(self):
+        self.con = tcod.console.Console(width=config.scr_width, height=config.scr_height)
+        self.frames = 0
+
+    def invalidate(self):
+        self.con.clear()
+
+    def render_all(self, g, mouse):
+        self.frames += 1
+
+    def clear_all(self):
+        pass
+
+    def flush(self):
+        pass
+
+
+def run(g, hero_input, max_turns=None):
+    """ Plays the game with the hero driven by hero_input until the hero goes
+        back to the main menu, dies, or max_turns have passed. Nothing is
+        saved. Returns the Engine so the caller can inspect the game.
+    """
+    eng = engine.Engine(g, NullRenderEngine(), hero_input=hero_input, autosave=False)
+    eng.play_game(max_turns=max_turns)
+    return eng
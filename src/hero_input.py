@@ -0,0 +1,83 @@
+""" Sources of actions for the hero.
+    The engine asks its hero input for the next action with get_action(g).
+    TcodInput waits on the keyboard/mouse like a normal game, the others let
+    the game loop be driven without a window (scripts, bots, key streams).
+"""
+import tcod
+from . import actions
+from . import input_handling
+
+
+class TcodInput(object):
+    """ Sleeps until the player presses a key or uses the mouse - nothing runs
+        while the game waits. Mouse moves return a NullAction so the engine
+        draws a frame with whatever is under the cursor.
+    """
+    def __init__(self, mouse):
+        self.mouse = mouse
+
+    def get_action(self, g):
+        self.mouse.reset()
+
+        while True:
+            for event in tcod.event.wait():
+                if isinstance(event, tcod.event.Quit):
+                    return actions.ExitAction(state=g.state)
+
+                action = self.handle_event(g, event)
+                if action:
+                    return action
+
+    def handle_event(self, g, event):
+        """Returns the action for a single event, or None to keep waiting."""
+        key = input_handling.process_tcod_event(event)
+
+        if key:
+            return input_handling.handle_keys(g.state, key)
+
+        if self.mouse.update(event):
+            return input_handling.handle_mouse(g.state, self.mouse) or actions.NullAction()
+
+        # The window was exposed or resized - draw it again.
+        if isinstance(event, tcod.event.WindowEvent):
+            return actions.NullAction()
+
+        return None
+
+
+class ScriptedInput(object):
+    """ Plays back a list of actions. Once the script runs out, the hero exits
+        to the main menu, which ends the game loop.
+    """
+    def __init__(self, script):
+        self.script = iter(script)
+
+    def get_action(self, g):
+        return next(self.script, None) or actions.ExitAction(state=g.state)
+
+
+class KeyInput(object):
+    """ Reads keys (in the same form as input_handling.process_tcod_input
+        returns) from any iterable - a list, a file or a socket's makefile().
+        Each line or item is one key. Once the keys run out, the hero exits to
+        the main menu.
+    """
+    def __init__(self, keys):
+        self.keys = iter(keys)
+
+    def get_action(self, g):
+        key = next(self.keys, None)
+
+        if key is None:
+            return actions.ExitAction(state=g.state)
+
+        return input_handling.handle_keys(g.state, key.strip('\n'))
+
+
+class PolicyInput(object):
+    """Asks a bot policy - any callable taking the game - for each action."""
+    def __init__(self, policy):
+        self.policy = policy
+
+    def get_action(self, g):
+        return self.policy(g)
@@ -1,3 +1,4 @@
+import math
 import tcod
 from .config import States
 from . import actions
@@ -214,6 +215,114 @@ def process_tcod_input(key):
     return key_char
 
 
+# tcod.event keys that map to movement keys.
+ARROW_KEYS = {
+    tcod.event.KeySym.LEFT: 'h',
+    tcod.event.KeySym.RIGHT: 'l',
+    tcod.event.KeySym.UP: 'k',
+    tcod.event.KeySym.DOWN: 'j',
+}
+
+KEYPAD_KEYS = {
+    tcod.event.KeySym.KP_1: 'b',
+    tcod.event.KeySym.KP_2: 'j',
+    tcod.event.KeySym.KP_3: 'n',
+    tcod.event.KeySym.KP_4: 'h',
+    tcod.event.KeySym.KP_5: '.',
+    tcod.event.KeySym.KP_6: 'l',
+    tcod.event.KeySym.KP_7: 'y',
+    tcod.event.KeySym.KP_8: 'k',
+    tcod.event.KeySym.KP_9: 'u',
+}
+
+
+def process_tcod_event(event):
+    """ Returns the key string for a tcod.event.KeyDown event, in the same form
+        process_tcod_input returns. Returns None for any other event, or keys
+        that don't type a character (ie: shift on its own).
+    """
+    if not isinstance(event, tcod.event.KeyDown):
+        return None
+
+    sym, mod = event.sym, event.mod
+
+    if sym == tcod.event.KeySym.ESCAPE:
+        return 'esc'
+
+    if sym == tcod.event.KeySym.RETURN and mod & tcod.event.Modifier.ALT:
+        return 'alt-enter'
+
+    if sym in ARROW_KEYS:
+        return ARROW_KEYS[sym]
+
+    if sym in KEYPAD_KEYS:
+        return KEYPAD_KEYS[sym]
+
+    if not 32 <= sym < 127:
+        return None
+
+    key_char = chr(sym)
+
+    if mod & tcod.event.Modifier.LCTRL:
+        return '^' + key_char
+
+    if mod & tcod.event.Modifier.SHIFT:
+        if key_char == '.':
+            return '>'
+        elif key_char == ',':
+            return '<'
+
+    return key_char
+
+
+def event_cell(event):
+    """ Returns the console cell under a mouse event. The event's pixel
+        position is converted the way the legacy root console scales it.
+        Without a root console (ie: headless) there is nothing to convert, so
+        the position is taken to be a cell already.
+    """
+    xy = tcod.ffi.new('double[2]', tuple(event.position))
+    tcod.lib.TCOD_sys_pixel_to_tile(xy, xy + 1)
+    x, y = xy
+
+    if not (math.isfinite(x) and math.isfinite(y)):
+        x, y = event.position
+
+    return math.floor(x), math.floor(y)
+
+
+class MouseState(object):
+    """ Stands in for the old tcod.Mouse, filled in from tcod.event events.
+        cx/cy is the console cell under the cursor, and the button flags are
+        set by a click until the next reset().
+    """
+    def __init__(self):
+        self.cx = 0
+        self.cy = 0
+        self.lbutton_pressed = False
+        self.rbutton_pressed = False
+
+    def update(self, event):
+        """Takes in a tcod.event event. Returns True if it was a mouse event."""
+        if isinstance(event, tcod.event.MouseMotion):
+            self.cx, self.cy = event_cell(event)
+
+        elif isinstance(event, tcod.event.MouseButtonUp):
+            self.cx, self.cy = event_cell(event)
+            if event.button == tcod.event.MouseButton.LEFT:
+                self.lbutton_pressed = True
+            elif event.button == tcod.event.MouseButton.RIGHT:
+                self.rbutton_pressed = True
+        else:
+            return False
+
+        return True
+
+    def reset(self):
+        self.lbutton_pressed = False
+        self.rbutton_pressed = False
+
+
 def handle_mouse(state, mouse):
     """ Takes in the mouse object from tcod and returns appropriate info.
 
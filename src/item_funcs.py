@@ -141,10 +141,9 @@ class UseConfuse(Use):
                 # 'consumed': False,
             )]
 
-        for entity in entities:
-            matches_coordinates = entity.x == target_x and entity.y == target_y
-
-            if matches_coordinates and entity.has_comp('ai'):
+        # Only look at what is on the target tile
+        for entity in entities.at(target_x, target_y):
+            if entity.has_comp('ai'):
                 confused_ai = ConfusedBehavior(owner=entity, prev_ai=entity.ai, num_turns=10)
                 entity.ai = confused_ai
 
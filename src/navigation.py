@@ -0,0 +1,139 @@
+import numpy as np
+import tcod
+
+# The normal diagonal cost of moving. Set to 0 to prohibit diagonal moves.
+DIAGONAL_COST = 1.41
+
+# Paths this long or longer aren't worth following - it keeps monsters from
+# running around the map if the only path is really far away.
+MAX_PATH_LEN = 25
+
+# Step costs for the distance maps. Above the low STEP_BITS bits is the
+# walking cost (the ratio of the two matches DIAGONAL_COST), and each step adds
+# 1 to the low bits - so a distance also counts the steps, see too_far().
+STEP_BITS = 6
+CARDINAL_STEP = (100 << STEP_BITS) + 1
+DIAGONAL_STEP = (141 << STEP_BITS) + 1
+
+# Distance map value for tiles the goal can't be reached from.
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+def too_far(dist):
+    """ Returns True if a distance map value is MAX_PATH_LEN or more steps.
+        Below MAX_PATH_LEN diagonal steps' cost a path has under 2 ** STEP_BITS
+        steps, so the count in the low bits is exact.
+    """
+    cost, steps = dist >> STEP_BITS, dist & ((1 << STEP_BITS) - 1)
+    return cost >= MAX_PATH_LEN * 141 or steps >= MAX_PATH_LEN
+
+
+NEIGHBOURS = (
+    (-1, -1), (0, -1), (1, -1),
+    (-1, 0), (1, 0),
+    (-1, 1), (0, 1), (1, 1),
+)
+
+
+class NavGraph(object):
+    """ Pathfinding cache for a single stage.
+        The terrain cost array is built from the stage's tiles once and only
+        rebuilt when the tiles change. Blocking entities are overlaid on a copy
+        of it for each path request.
+    """
+    def __init__(self, stage):
+        self.stage = stage
+        self.terrain = None
+        self.tiles = None
+        self.version = None
+
+        # Distance map toward a single goal - shared by every entity heading there.
+        self.field = None
+        self.field_goal = None
+        self.field_terrain = None
+
+    def terrain_cost(self):
+        """Returns the (width, height) cost array for the bare terrain: 1 for
+            walkable tiles, 0 for walls.
+        """
+        tiles = self.stage.tiles
+
+        if self.tiles is not tiles or self.version != tiles.version:
+            self.terrain = (~tiles.blocks).astype(np.int8)
+            self.tiles = tiles
+            self.version = tiles.version
+
+        return self.terrain
+
+    def cost(self, ignore=()):
+        """Returns a copy of the terrain cost with every blocking entity set as
+            a wall, except for the entities in ignore.
+        """
+        terrain = self.terrain_cost()
+        cost = terrain.copy()
+
+        # The stage keeps a count of blockers per tile - use it as a mask.
+        cost[self.stage.index.blockers > 0] = 0
+
+        for e in ignore:
+            cost[e.x, e.y] = terrain[e.x, e.y]
+
+        return cost
+
+    def get_path(self, entity, target):
+        """Returns a list of (x, y) steps from the entity to the target, not
+            including the entity's position. Other blocking entities are walked
+            around. If there is no path, returns an empty list.
+        """
+        cost = self.cost(ignore=(entity, target))
+        astar = tcod.path.AStar(cost, diagonal=DIAGONAL_COST)
+
+        return astar.get_path(entity.x, entity.y, target.x, target.y)
+
+    def flow_field(self, x, y):
+        """Returns a (width, height) array holding the walking distance from
+            every tile to (x, y), or UNREACHABLE. It is computed with a single
+            Dijkstra pass and reused until the goal moves or the terrain
+            changes.
+        """
+        terrain = self.terrain_cost()
+
+        if self.field_goal != (x, y) or self.field_terrain is not terrain:
+            dist = np.full(terrain.shape, UNREACHABLE, dtype=np.int32)
+            dist[x, y] = 0
+            tcod.path.dijkstra2d(dist, terrain, CARDINAL_STEP, DIAGONAL_STEP, out=dist)
+
+            self.field = dist
+            self.field_goal = (x, y)
+            self.field_terrain = terrain
+
+        return self.field
+
+    def descend(self, entity, target):
+        """Returns the (dx, dy) step that brings the entity closest to the target
+            following the target's flow field. Neighbouring tiles with a blocking
+            entity (other than the target) are skipped.
+            Returns None if there is no step that gets closer, or the target is
+            MAX_PATH_LEN or more steps away.
+        """
+        dist = self.flow_field(target.x, target.y)
+        best = dist[entity.x, entity.y]
+
+        if too_far(best):
+            return None
+
+        step = None
+        for dx, dy in NEIGHBOURS:
+            x, y = entity.x + dx, entity.y + dy
+
+            if x < 0 or y < 0 or x >= self.stage.width or y >= self.stage.height:
+                continue
+
+            if dist[x, y] < best:
+                blocker = self.stage.get_blocker_at_loc(x, y)
+
+                if blocker is None or blocker is target:
+                    best = dist[x, y]
+                    step = dx, dy
+
+        return step
@@ -1,12 +1,13 @@
-from random import randint
+import random
 
 
-def rnd_choice_index(chances):
+def rnd_choice_index(chances, rng=random):
     """Takes a list of integers that represent weights and takes a random pick.
-        Returns the index of the weight that was picked.
+        Returns the index of the weight that was picked. The pick is drawn from
+        rng (a random.Random), or the random module by default.
     """
     # Generate a random # up to the sum of all chance weights
-    rnd_chance = randint(1, sum(chances))
+    rnd_chance = rng.randint(1, sum(chances))
 
     running_sum = 0
     choice = 0
@@ -18,11 +19,11 @@ def rnd_choice_index(chances):
         choice += 1
 
 
-def rnd_choice_from_dict(choice_dict):
+def rnd_choice_from_dict(choice_dict, rng=random):
     choices = list(choice_dict.keys())
     chances = list(choice_dict.values())
 
-    return choices[rnd_choice_index(chances)]
+    return choices[rnd_choice_index(chances, rng)]
 
 
 def from_dungeon_lvl(table, dungeon_lvl):
@@ -1,8 +1,12 @@
+import numpy as np
 import tcod
 from . import config
 from .config import States
 from . import menus
 
+# An empty black console cell.
+BLANK = (ord(' '), (255, 255, 255), (0, 0, 0))
+
 
 class RenderEngine(object):
     def __init__(self):
@@ -26,16 +30,36 @@ class RenderEngine(object):
         self.panel = tcod.console.Console(width=config.scr_width, height=config.panel_height)
         self.msg_panel = tcod.console.Console(width=config.scr_width, height=config.msg_height)
 
-    def render_all(self, g, mouse):
-        # Draw all the tiles in the stage
-        if g.fov_recompute:
-            self.render_tiles(g)
+        # What each tile cell on self.con showed last frame, the cells
+        # entities were erased from since then, and where entities were drawn.
+        self.tile_state = None
+        self.tile_layer = None
+        self.cleared = []
+        self.drawn = []
+
+        # The pre-rendered main menu, built on first use.
+        self.menu_con = None
+
+        # Menu windows by (width, height) and header heights by (header, width),
+        # kept so an open menu doesn't allocate or measure anything each frame.
+        self.windows = {}
+        self.header_heights = {}
+
+    def invalidate(self):
+        """Clears the map console so the next frame repaints every tile."""
+        self.con.clear()
+        self.tile_state = None
+        self.tile_layer = None
+        self.cleared = []
+        self.drawn = []
 
-        # Draw all entities in the list
-        sorted_entities = sorted(g.stage.entities, key=lambda x: x.render_order.value)
+    def render_all(self, g, mouse):
+        # Draw the tiles that changed since the last frame
+        self.render_tiles(g)
 
-        for entity in sorted_entities:
-            self.draw_entity(entity, g.fov_map, g.stage)
+        # Draw the entities in view, already bucketed in render order
+        visible = g.fov_map.fov.T
+        self.draw_entities(g.stage.render_index.in_view(visible, g.stage.tiles.explored))
 
         # Display console
         self.con.blit(
@@ -69,87 +93,76 @@ class RenderEngine(object):
         self.render_status_bar(g, mouse)
         self.render_console_messages(g.msg_log)
 
-    def render_tiles(self, g):
-        # visible = fov_map.fov[:]
-
-        for y in range(g.stage.height):
-            for x in range(g.stage.width):
-                visible = g.fov_map.fov[y, x]
-
-                wall = g.stage.tiles[x][y].block_sight
-
-                # Tiles within field-of-vision
-                if visible:
-                    if wall:
-                        tcod.console_put_char_ex(
-                            con=self.con,
-                            x=x, y=y,
-                            c='#',
-                            fore=tcod.white,
-                            back=tcod.black,
-                        )
-                    else:
-                        tcod.console_put_char_ex(
-                            con=self.con,
-                            x=x, y=y,
-                            c='.',
-                            fore=tcod.white,
-                            back=tcod.black
-                        )
-
-                    # It's visible therefore explored
-                    g.stage.tiles[x][y].explored = True
-
-                # Tiles outside field-of-vision
-                elif g.stage.tiles[x][y].explored:
-                    if wall:
-                        tcod.console_put_char_ex(
-                            con=self.con,
-                            x=x, y=y,
-                            c='#',
-                            fore=tcod.white,
-                            back=tcod.black,
-                        )
-
-                    else:
-                        tcod.console_put_char_ex(
-                            con=self.con,
-                            x=x, y=y,
-                            c='.',
-                            fore=tcod.white,
-                            back=tcod.black,
-                        )
-
-    def clear_all(self, entities):
-        # Clear all entities on the console
-        for entity in entities:
-            self.clear_entity(entity)
-
-    def clear_entity(self, entity):
-        # Erase the character that represents this object
-        tcod.console_put_char(
-            con=self.con,
-            x=entity.x, y=entity.y,
-            c=' ',
-            flag=tcod.BKGND_NONE
-        )
-
-    def draw_entity(self, entity, fov_map, stage):
-        # Draw an entity on the console
-        entity_in_fov = fov_map.fov[entity.y, entity.x]
-
-        # todo: Break into nicer booleans
-        stair_entity = ((entity.has_comp('stair_down') or entity.has_comp('stair_up')) and stage.tiles[entity.x][entity.y].explored)
-
-        if entity_in_fov or stair_entity:
-            self.con.default_fg = entity.color
+    def flush(self):
+        # Presents the root console on screen
+        tcod.console_flush()
 
-            tcod.console_put_char(
-                con=self.con,
-                x=entity.x, y=entity.y,
-                c=entity.char,
-                flag=tcod.BKGND_NONE
-            )
+    def render_tiles(self, g):
+        tiles = g.stage.tiles
+
+        # The fov map is indexed [y, x] while the stage tiles are [x, y]
+        visible = g.fov_map.fov.T
+
+        # It's visible therefore explored
+        tiles.explored[visible] = True
+
+        # What each cell should show: 0 = nothing yet, 1 = remembered, 2 = in view
+        state = tiles.explored.astype(np.int8) + visible
+        lit, dark = g.stage.layers.get()
+
+        # Diff against the last frame - only cells that changed are drawn,
+        # plus explored cells an entity was erased from. New layers (another
+        # stage, or the terrain changed) mean everything is drawn.
+        if self.tile_state is None or self.tile_layer is not lit:
+            dirty = state > 0
+        else:
+            dirty = state != self.tile_state
+
+        if self.cleared:
+            xs, ys = np.array(self.cleared).T
+            inside = (xs >= 0) & (ys >= 0) & (xs < tiles.width) & (ys < tiles.height)
+            xs, ys = xs[inside], ys[inside]
+            dirty[xs, ys] |= state[xs, ys] > 0
+
+        # Copy the dirty cells from the layers straight into the console
+        # buffers, which are indexed [y, x]. The console can be bigger than
+        # the stage, so write through a stage-sized view of it.
+        dirty, state = dirty.T, state.T
+        in_view = dirty & (state == 2)
+        remembered = dirty & (state == 1)
+        view = self.con.rgb[:tiles.height, :tiles.width]
+
+        view[in_view] = lit[in_view]
+        view[remembered] = dark[remembered]
+        view[dirty & (state == 0)] = BLANK
+
+        self.tile_state = state.T
+        self.tile_layer = lit
+        self.cleared = []
+
+    def clear_all(self):
+        # Erase the entities drawn last frame - the tiles under them get drawn
+        # again next frame.
+        if self.drawn:
+            xs, ys = np.array(self.drawn).T
+            self.con.ch[ys, xs] = ord(' ')
+
+        self.cleared.extend(self.drawn)
+        self.drawn = []
+
+    def draw_entities(self, entities):
+        """ Stamps the entities onto the console in one go. Where entities
+            share a tile, the last one in the list is drawn.
+        """
+        top = {(e.x, e.y): e for e in entities}
+        self.drawn = list(top)
+
+        if not top:
+            return
+
+        xs, ys = np.array(self.drawn).T
+        self.con.ch[ys, xs] = [ord(e.char) for e in top.values()]
+        self.con.fg[ys, xs] = [tuple(e.color) for e in top.values()]
 
     def render_bar(self, x, y, total_width, name, value, maximum, bar_color, back_color):
         bar_width = int(float(value) / maximum * total_width)
@@ -244,7 +257,7 @@ class RenderEngine(object):
         # Display entity under mouse
         self.panel.print(
             x=1, y=0,
-            string=get_names_under_mouse(mouse, g.stage.entities, g.fov_map),
+            string=get_names_under_mouse(mouse, g.stage, g.fov_map),
             alignment=tcod.LEFT,
         )
 
@@ -258,27 +271,20 @@ class RenderEngine(object):
             height=config.panel_height,
         )
 
-    def render_menu(self, header, options, width):
-        """ Display a menu of options. Each option has a letter to the left side."""
+    def render_menu(self, header, options, width, dest=None):
+        """ Display a menu of options. Each option has a letter to the left side.
+            The menu is drawn on dest, the root console by default.
+        """
         if len(options) > config.MAX_MENU_ITEMS:
             raise ValueError('Cannot have a menu with more than 26 options.')
 
         # Calculate total height for the header (after auto-wrap) and one line per option
-        header_height = tcod.console_get_height_rect(
-            con=self.con,
-            x=0, y=0,
-            w=width,
-            h=config.scr_height,
-            fmt=header
-        )
+        header_height = self.header_height(header, width)
 
         height = len(options) + header_height
 
-        # Create an off-screen console that represents the menu's window
-        window = tcod.console.Console(width=width, height=height)
-
-        window.default_fg = tcod.white
-        window.default_bg = tcod.black
+        # Get an off-screen console that represents the menu's window
+        window = self.get_window(width, height)
 
         # Print a string constrained to a rectangle with blend and alignment.
         window.print(
@@ -299,47 +305,88 @@ class RenderEngine(object):
 
         # Blit the contents of "window" to the root console
         window.blit(
-            dest=self.root,
+            dest=self.root if dest is None else dest,
             dest_x=x, dest_y=y,
             src_x=0, src_y=0,
             width=width,
             height=height,
         )
 
+    def get_window(self, width, height):
+        """ Returns a blank off-screen console of the given size. Consoles are
+            reused, so the window is only good until the next call.
+        """
+        window = self.windows.get((width, height))
+
+        if window is None:
+            window = tcod.console.Console(width=width, height=height)
+            self.windows[width, height] = window
+
+        window.default_fg = tcod.white
+        window.default_bg = tcod.black
+        window.clear(fg=tcod.white, bg=tcod.black)
+        return window
+
+    def header_height(self, header, width):
+        """Returns how many lines the header takes up once wrapped to width."""
+        key = header, width
+
+        if key not in self.header_heights:
+            self.header_heights[key] = tcod.console_get_height_rect(
+                con=self.con,
+                x=0, y=0,
+                w=width,
+                h=config.scr_height,
+                fmt=header
+            )
+
+        return self.header_heights[key]
+
     def render_main_menu(self, menu_img):
-        """ Displays the main menu for the game."""
+        """ Displays the main menu for the game. The menu is only drawn once,
+            then copied to the root console until invalidate_menu is called.
+        """
+        if self.menu_con is None:
+            self.menu_con = self.mk_main_menu(menu_img)
 
-        tcod.image_blit_2x(image=menu_img, console=self.root, dx=0, dy=0)
+        self.menu_con.blit(dest=self.root)
 
-        self.root.default_fg=tcod.light_yellow
+    def mk_main_menu(self, menu_img):
+        """Returns an offscreen console with the main menu drawn on it."""
+        menu_con = tcod.console.Console(width=config.scr_width, height=config.scr_height)
+
+        tcod.image_blit_2x(image=menu_img, console=menu_con, dx=0, dy=0)
+
+        menu_con.default_fg = tcod.light_yellow
 
         # Display game title
         title_x = int(config.scr_width / 2)
         title_y = 3
 
-        self.root.print(x=title_x, y=title_y, string=config.game_title, alignment=tcod.CENTER)
+        menu_con.print(x=title_x, y=title_y, string=config.game_title, alignment=tcod.CENTER)
 
         # Display author
         author_x = int(config.scr_width / 2)
         author_y = int(config.scr_height - 2)
 
-        self.root.print(x=author_x, y=author_y, string='By {}'.format(config.author), alignment=tcod.CENTER)
+        menu_con.print(x=author_x, y=author_y, string='By {}'.format(config.author), alignment=tcod.CENTER)
 
         # Display main menu options
         options = menus.main_menu_options()
-        self.render_menu('', options, 24)
+        self.render_menu('', options, 24, dest=menu_con)
+
+        return menu_con
+
+    def invalidate_menu(self):
+        """Drops the pre-rendered main menu (ie: the window was resized)."""
+        self.menu_con = None
 
     def render_msg_box(self, header, width):
         self.render_menu(header, [], width)
 
     def render_char_scr(self, hero):
         """ Displays a windows showing the hero's current stats and experience."""
-        window = tcod.console.Console(
-            width=config.char_scr_width,
-            height=config.char_scr_height
-        )
-
-        window.default_fg = tcod.white
+        window = self.get_window(config.char_scr_width, config.char_scr_height)
         info = menus.hero_info(hero)
 
         for i, row in enumerate(info):
@@ -364,10 +411,13 @@ class RenderEngine(object):
         )
 
 
-def get_names_under_mouse(mouse, entities, fov_map):
+def get_names_under_mouse(mouse, stage, fov_map):
     # note: Due to the message console - we have to offset the y.
     x, y = mouse.cx, mouse.cy - config.msg_height
 
-    names = [e.name for e in entities if e.x == x and e.y == y and fov_map.fov[e.y, e.x]]
+    if not (0 <= x < stage.width and 0 <= y < stage.height) or not fov_map.fov[y, x]:
+        return ''
+
+    names = [e.name for e in stage.entities_at(x, y)]
     names = ', '.join(names)
     return names.capitalize()
@@ -0,0 +1,72 @@
+import numpy as np
+from .config import RenderOrder
+
+
+class RenderIndex(object):
+    """ The entities on a stage bucketed by RenderOrder, so drawing them
+        doesn't need a sort every frame.
+        Each bucket keeps its entities by (x, y) tile along with a
+        (width, height) count of how many are on each tile, so the entities in
+        view can be found by masking the counts with the fov.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.orders = sorted(RenderOrder, key=lambda order: order.value)
+        self.cells = {order: {} for order in self.orders}
+        self.counts = {order: np.zeros((width, height), dtype=np.int16) for order in self.orders}
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, e):
+        return e in self.positions
+
+    def add(self, e):
+        order = e.components.get('render_order')
+
+        # Entities without a render order never get drawn.
+        if order is None:
+            return
+
+        x, y = e.x, e.y
+        self.positions[e] = (order, x, y)
+        self.cells[order].setdefault((x, y), []).append(e)
+
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.counts[order][x, y] += 1
+
+    def remove(self, e):
+        if e not in self.positions:
+            return
+
+        order, x, y = self.positions.pop(e)
+
+        bucket = self.cells[order][(x, y)]
+        bucket.remove(e)
+        if not bucket:
+            del self.cells[order][(x, y)]
+
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.counts[order][x, y] -= 1
+
+    def update(self, e):
+        """Re-files an entity after its position or render order changed."""
+        if (e.components.get('render_order'), e.x, e.y) != self.positions.get(e):
+            self.remove(e)
+            self.add(e)
+
+    def in_view(self, visible, explored):
+        """ Returns the entities to draw in render order: the ones on visible
+            tiles, plus stairs on explored tiles. Both masks are (width, height).
+        """
+        entities = []
+
+        for order in self.orders:
+            mask = explored if order == RenderOrder.STAIRS else visible
+
+            for x, y in np.argwhere(mask & (self.counts[order] > 0)):
+                entities.extend(self.cells[order][(x, y)])
+
+        return entities
@@ -0,0 +1,42 @@
+""" Seedable random number streams.
+    A game has one RNG made from its seed. Everything random in the game draws
+    from a stream of it, keyed by (depth, purpose) - ie: (3, 'stage') makes
+    the third stage. Each stream's seed is a hash of the game seed and its key,
+    so streams don't depend on each other or on the order they're used in:
+    a stage can be made in another process, or made again later, from just
+    the game seed.
+"""
+import hashlib
+import random
+
+# Stream purposes
+STAGE = 'stage'     # Making and populating a stage
+PLAY = 'play'       # Random events on a stage after it's been loaded back in
+
+
+def derive_seed(*keys):
+    """Returns a 64-bit seed made from hashing the keys."""
+    data = ':'.join(str(k) for k in keys).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+class RNG(object):
+    """ The random number service for a game. Without a seed, one is drawn
+        from the random module - so random.seed() still makes it repeatable.
+    """
+    def __init__(self, seed=None):
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.streams = {}
+
+    def derive(self, depth, purpose):
+        """Returns the seed of the (depth, purpose) stream."""
+        return derive_seed(self.seed, depth, purpose)
+
+    def stream(self, depth, purpose):
+        """Returns the random.Random for (depth, purpose), made on first use."""
+        key = depth, purpose
+
+        if key not in self.streams:
+            self.streams[key] = random.Random(self.derive(depth, purpose))
+
+        return self.streams[key]
@@ -0,0 +1,122 @@
+import heapq
+import itertools
+from . import config
+
+
+class Scheduler(object):
+    """ Time-ordered queue of the actors on the current stage.
+        Instead of giving every actor energy each turn and checking whether it
+        can act, every actor sits in a heap keyed by the turn it will next have
+        enough energy to act (worked out from its EnergyMeter). Only the actor
+        on top is looked at, so slow or idle actors cost nothing between their
+        actions.
+        Energy is credited lazily - an actor's meter is only topped up for the
+        turns it waited when it comes up to act, or on flush(). Actors due on
+        the same turn act in the order they joined the stage, like the old
+        round-robin loop did.
+    """
+    def __init__(self, now=0, energy_per_turn=config.energy_per_turn):
+        self.energy_per_turn = energy_per_turn
+        self.now = now
+        self.last = None        # The last turn an actor was popped on.
+
+        self.heap = []
+        self.entries = {}       # actor -> (ready, order) of its live heap entry
+        self.credited = {}      # actor -> the last turn its energy was added for
+        self.order = {}         # actor -> its place in the stage's actor order
+        self.seq = itertools.count()
+
+        # The stage's component index (and its actor version) last synced to.
+        self.comps = None
+        self.version = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def sync(self, stage):
+        """Schedules the actors that joined the stage and forgets the ones that
+            left. If the stage (or its component index) changed, the whole
+            schedule is rebuilt in the new stage's actor order.
+        """
+        comps = stage.comps
+
+        if comps is self.comps and comps.actor_version == self.version:
+            return
+
+        actors = comps.get('actor')
+
+        if comps is not self.comps:
+            self.flush()
+            self.heap = []
+            self.entries = {}
+            self.order = {}
+
+        current = set(actors)
+        for e in [e for e in self.credited if e not in current]:
+            self.entries.pop(e, None)
+            self.order.pop(e, None)
+            del self.credited[e]
+
+        # Actors joining mid-turn first get energy on the next turn.
+        first = self.now if self.last == self.now else self.now - 1
+
+        for e in actors:
+            if e not in self.order:
+                self.order[e] = next(self.seq)
+                self.credited.setdefault(e, first)
+                self.schedule(e)
+
+        self.comps = comps
+        self.version = comps.actor_version
+
+    def schedule(self, e):
+        """(Re)files the actor under the turn its energy reaches its threshold."""
+        ready = self.credited[e] + e.energymeter.turns_until_ready(self.energy_per_turn)
+        entry = ready, self.order[e]
+
+        self.entries[e] = entry
+        heapq.heappush(self.heap, entry + (e,))
+
+    def peek(self, stage):
+        """Returns the turn the next actor acts on, or None if there are no actors."""
+        self.sync(stage)
+
+        # Drop entries left behind by actors that were rescheduled or left.
+        while self.heap:
+            ready, order, e = self.heap[0]
+            if self.entries.get(e) == (ready, order):
+                return ready
+            heapq.heappop(self.heap)
+
+        return None
+
+    def pop(self, stage):
+        """Returns (turn, actor) for the next actor to act, with the energy it
+            gained while waiting added, or None if there are no actors.
+            Call push() with the actor once it has acted.
+        """
+        if self.peek(stage) is None:
+            return None
+
+        ready, order, e = heapq.heappop(self.heap)
+        del self.entries[e]
+
+        e.energymeter.add_energy(self.energy_per_turn * (ready - self.credited[e]))
+        self.credited[e] = ready
+        self.now = self.last = ready
+
+        return ready, e
+
+    def push(self, e):
+        """Puts an actor back in the queue after it has acted."""
+        if e in self.order and e not in self.entries:
+            self.schedule(e)
+
+    def flush(self):
+        """Adds the energy every actor has earned in the turns before the
+            current one, so the meters are up to date (ie: before saving).
+        """
+        for e, credited in self.credited.items():
+            if credited < self.now - 1:
+                e.energymeter.add_energy(self.energy_per_turn * (self.now - 1 - credited))
+                self.credited[e] = self.now - 1
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class SpatialIndex(object):
+    """ Position-keyed lookup of the entities on a stage.
+        Entities are bucketed by their (x, y) tile in a spatial hash, and the
+        number of blocking entities on each tile is kept in a (width, height)
+        array so it can be used as a blocker bitmap.
+        The index remembers where it filed each entity, so an entity can be
+        moved or removed even after its x/y have already changed.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = {}
+        self.positions = {}
+        self.blockers = np.zeros((width, height), dtype=np.int16)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, e):
+        return e in self.positions
+
+    def add(self, e):
+        x, y = e.x, e.y
+        blocks = e.components.get('blocks', False)
+
+        self.positions[e] = (x, y, blocks)
+        self.cells.setdefault((x, y), []).append(e)
+
+        if blocks:
+            self._count_blocker(x, y, 1)
+
+    def remove(self, e):
+        x, y, blocks = self.positions.pop(e)
+
+        bucket = self.cells[(x, y)]
+        bucket.remove(e)
+        if not bucket:
+            del self.cells[(x, y)]
+
+        if blocks:
+            self._count_blocker(x, y, -1)
+
+    def update(self, e):
+        """Re-files an entity after its position or blocks changed."""
+        if (e.x, e.y, e.components.get('blocks', False)) != self.positions[e]:
+            self.remove(e)
+            self.add(e)
+
+    def at(self, x, y):
+        """Returns a list of the entities on the tile."""
+        return list(self.cells.get((x, y), ()))
+
+    def is_occupied(self, x, y):
+        return (x, y) in self.cells
+
+    def occupied(self):
+        """Returns a (width, height) bool array of the tiles with entities on them."""
+        mask = np.zeros((self.width, self.height), dtype=bool)
+
+        if self.cells:
+            x, y = np.array(list(self.cells)).T
+            inside = (0 <= x) & (x < self.width) & (0 <= y) & (y < self.height)
+            mask[x[inside], y[inside]] = True
+
+        return mask
+
+    def blocker_at(self, x, y):
+        """Returns the last blocking entity filed at the tile, or None."""
+        for e in reversed(self.cells.get((x, y), ())):
+            if e.blocks:
+                return e
+        return None
+
+    def blocked(self, x, y):
+        """Returns True if a blocking entity is on the tile."""
+        if self._in_bounds(x, y):
+            return bool(self.blockers[x, y])
+        return False
+
+    def _in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def _count_blocker(self, x, y, amt):
+        if self._in_bounds(x, y):
+            self.blockers[x, y] += amt
@@ -0,0 +1,267 @@
+""" Turning stages into bytes and back, for save files and for stages the
+    dungeon spills to disk.
+    A stage is stored as its layout record (size, depth and rooms), its tile
+    planes bit-packed with NumPy and its pickled entity list. The hero is
+    pickled as a reference, since it's stored once with the rest of the game.
+    The entities are pickled objects, so their component classes have to keep
+    their names for old data to load (see data_loaders).
+"""
+import io
+import numbers
+import pickle
+import pickletools
+import tempfile
+import numpy as np
+from . import entity
+from . import stages
+from .rect import Rect
+from .tile import TileGrid, tile_dt
+
+HERO_ID = 'hero'
+
+# What loading damaged pickle data can raise, besides UnpicklingError itself
+UNPICKLE_ERRORS = (
+    pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError,
+    KeyError, TypeError, ValueError, OverflowError, MemoryError, RecursionError,
+)
+
+# Opcodes that store to the memo at the index they're given
+MEMO_PUTS = ('PUT', 'BINPUT', 'LONG_BINPUT')
+
+
+class EntityPickler(pickle.Pickler):
+    """Pickles a stage's entities with the hero written as a reference."""
+    def __init__(self, f, hero):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.hero = hero
+
+    def persistent_id(self, obj):
+        return HERO_ID if obj is self.hero else None
+
+
+class EntityUnpickler(pickle.Unpickler):
+    def __init__(self, f, hero):
+        super().__init__(f)
+        self.hero = hero
+
+    def persistent_load(self, pid):
+        if pid != HERO_ID:
+            raise pickle.UnpicklingError('Unknown persistent id: {}'.format(pid))
+        return self.hero
+
+
+class SavedStage(object):
+    """ A stage that is still in a save or spill file. Its tiles and entities
+        are views into the memory-mapped file, so nothing is read from disk
+        until load() is called (by Dungeon.stage_at) or the game is saved.
+        source is the absolute path of the save file the buffers map, if any.
+    """
+    def __init__(self, info, tile_buf, entity_buf, hero, source=None):
+        self.info = info
+        self.tile_buf = tile_buf
+        self.entity_buf = entity_buf
+        self.hero = hero
+        self.source = source
+
+    @property
+    def dungeon_lvl(self):
+        return self.info['dungeon_lvl']
+
+    def load(self):
+        return load_stage(self.info, self.tile_buf, self.entity_buf, self.hero)
+
+
+def pack_tiles(tiles):
+    """Returns the tile planes of a TileGrid, bit-packed one after another."""
+    return b''.join(np.packbits(tiles.data[name]).tobytes() for name in tile_dt.names)
+
+
+def unpack_tiles(buf, width, height):
+    """ Builds a TileGrid from the planes written by pack_tiles. Raises
+        ValueError if buf is not the right size for them.
+    """
+    cells = width * height
+    plane_size = (cells + 7) // 8
+    packed = np.frombuffer(buf, dtype=np.uint8)
+
+    # Checked before anything is allocated, so a damaged size can't ask for
+    # more memory than the file holds.
+    if len(packed) != plane_size * len(tile_dt.names):
+        raise ValueError('Stage tile data is damaged.')
+
+    tiles = TileGrid(width, height)
+
+    for i, name in enumerate(tile_dt.names):
+        plane = packed[i * plane_size:(i + 1) * plane_size]
+        tiles.data[name] = np.unpackbits(plane, count=cells).reshape(width, height)
+
+    return tiles
+
+
+def pickle_entities(entities, hero):
+    f = io.BytesIO()
+    EntityPickler(f, hero).dump(list(entities))
+    return f.getvalue()
+
+
+def check_pickle(buf):
+    """ Walks the opcodes of the pickle in buf without running them. Raises
+        ValueError if they're malformed, or if one would have the unpickler
+        allocate more than buf could ever need (ie: a huge memo index) - the
+        OS may kill the game for that before a MemoryError is raised.
+    """
+    try:
+        for op, arg, pos in pickletools.genops(io.BytesIO(buf)):
+            if op.name in MEMO_PUTS and arg > len(buf):
+                raise ValueError('Memo index {} is out of range.'.format(arg))
+    except UNPICKLE_ERRORS as err:
+        raise ValueError('Pickle data is damaged: {}'.format(err)) from err
+
+
+def unpickle_entities(buf, hero):
+    """Raises ValueError if the entity data can't be unpickled."""
+    check_pickle(buf)
+
+    try:
+        return EntityUnpickler(io.BytesIO(buf), hero).load()
+    except UNPICKLE_ERRORS as err:
+        raise ValueError('Stage entity data is damaged: {}'.format(err)) from err
+
+
+def stage_record(stage):
+    if isinstance(stage, SavedStage):
+        return {k: stage.info[k] for k in ('width', 'height', 'dungeon_lvl', 'rooms')}
+
+    return {
+        'width': stage.width,
+        'height': stage.height,
+        'dungeon_lvl': stage.dungeon_lvl,
+        'rooms': [(r.x1, r.y1, r.x2, r.y2) for r in stage.rooms],
+    }
+
+
+def stage_bytes(stage, hero):
+    """Returns the (tiles, entities) data to save for a stage."""
+    if isinstance(stage, SavedStage):
+        # Never loaded - copy it over from its file as is.
+        return stage.tile_buf, stage.entity_buf
+
+    return pack_tiles(stage.tiles), pickle_entities(stage.entities, hero)
+
+
+def write_block(f, data):
+    """Writes data and returns its (offset, size) in the file."""
+    offset = f.tell()
+    f.write(data)
+    return offset, len(data)
+
+
+def valid_entity(e, width, height):
+    """Returns True if e is an Entity with a position on the stage."""
+    # Look past Entity.__getattr__ - a damaged entity may have no components.
+    components = getattr(e, '__dict__', {}).get('components')
+
+    if not isinstance(e, entity.Entity) or not isinstance(components, dict):
+        return False
+
+    x, y = components.get('x'), components.get('y')
+    return (
+        isinstance(x, numbers.Integral) and isinstance(y, numbers.Integral)
+        and 0 <= x < width and 0 <= y < height
+    )
+
+
+def load_stage(info, tile_buf, entity_buf, hero):
+    """Builds a Stage from its saved data. Raises ValueError if it's damaged."""
+    try:
+        tiles = unpack_tiles(tile_buf, info['width'], info['height'])
+        stage = stages.Stage(info['width'], info['height'], info['dungeon_lvl'])
+        stage.tiles = tiles
+        stage.rooms = [Rect(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in info['rooms']]
+
+        entities = unpickle_entities(entity_buf, hero)
+        if not isinstance(entities, list) or not all(
+            valid_entity(e, stage.width, stage.height) for e in entities
+        ):
+            raise ValueError('Stage entity data is damaged.')
+
+        stage.entities = entities
+    except UNPICKLE_ERRORS as err:
+        raise ValueError('Stage data is damaged: {}'.format(err)) from err
+
+    return stage
+
+
+class SpillFile(object):
+    """ A temp file that stages are written out to when they're evicted from
+        memory. Each stage is read back through its own memory map. Once a
+        stage has been loaded back in, its space is released and reused for
+        the next stage that fits, so the file only grows as large as the
+        stages spilled at the same time. The file goes away when it's closed
+        or collected.
+    """
+    def __init__(self):
+        self.f = tempfile.TemporaryFile()
+        self.size = 0
+
+        # Released (offset, size) extents, by offset
+        self.free = []
+
+    def spill(self, stage, hero):
+        """Writes the stage to the file and returns a SavedStage for it."""
+        tile_buf, entity_buf = stage_bytes(stage, hero)
+        info = stage_record(stage)
+        offset = self.alloc(len(tile_buf) + len(entity_buf))
+
+        self.f.seek(offset)
+        info['tiles'] = write_block(self.f, tile_buf)
+        info['entities'] = write_block(self.f, entity_buf)
+        self.f.flush()
+
+        return SavedStage(info, self.view(*info['tiles']), self.view(*info['entities']), hero)
+
+    def release(self, saved):
+        """ Frees the space of a SavedStage from this file. It must not be
+            read again - call this once it has been loaded.
+        """
+        offset, tile_size = saved.info['tiles']
+        size = tile_size + saved.info['entities'][1]
+
+        if not size:
+            return
+
+        self.free.append((offset, size))
+        self.free.sort()
+
+        # Merge neighbouring extents
+        merged = [self.free[0]]
+        for offset, size in self.free[1:]:
+            last_offset, last_size = merged[-1]
+            if last_offset + last_size == offset:
+                merged[-1] = (last_offset, last_size + size)
+            else:
+                merged.append((offset, size))
+
+        self.free = merged
+
+    def alloc(self, size):
+        """Returns the offset of the first free extent that fits size bytes."""
+        for i, (offset, free_size) in enumerate(self.free):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free[i]
+                else:
+                    self.free[i] = (offset + size, free_size - size)
+                return offset
+
+        offset = self.size
+        self.size += size
+        return offset
+
+    def view(self, offset, size):
+        if not size:
+            return b''
+        return np.memmap(self.f, dtype=np.uint8, mode='r', offset=offset, shape=(size,))
+
+    def close(self):
+        self.f.close()
@@ -1,14 +1,25 @@
 import math
 import random
+import numpy as np
 from . import config
+from . import entity
 from . import factory
+from . import navigation
 from . import stairs
+from .comp_index import ComponentIndex
+from .entity_list import EntityList
 from .rect import Rect
-from .tile import Tile
+from .render_index import RenderIndex
+from .spatial import SpatialIndex
+from .tile import TileGrid
+from .tile_layers import TileLayers
+
+# Random tiles get_random_open_spot tries before looking only at free tiles.
+OPEN_SPOT_TRIES = 10
 
 
 class Stage(object):
-    def __init__(self, width, height, dungeon_lvl=config.DEFAULT_DUNGEON_LVL):
+    def __init__(self, width, height, dungeon_lvl=config.DEFAULT_DUNGEON_LVL, rng=None):
         # Error checking
         if width < config.stage_length_min or height < config.stage_length_min:
             raise ValueError("The minimum map width/height is {}".format(config.stage_length_min))
@@ -22,48 +33,154 @@ class Stage(object):
         self.rooms = []
         self.dungeon_lvl = dungeon_lvl
 
+        # Where the stage's random numbers come from (see rng.RNG). Without
+        # one, it's seeded from the random module.
+        self.rng = rng if rng is not None else random.Random(random.getrandbits(64))
+
+        # Pathfinding and render caches - rebuilt only when the terrain changes.
+        self.nav = navigation.NavGraph(self)
+        self.layers = TileLayers(self)
+
+        # (tiles, version, cells) - the floor cells and the tiles they came from.
+        self.floor_cache = None
+
+    @property
+    def tiles(self):
+        return self._tiles
+
+    @tiles.setter
+    def tiles(self, tiles):
+        # Older code (and saves) use a list of lists of Tiles - convert them.
+        if not isinstance(tiles, TileGrid):
+            tiles = TileGrid.from_tiles(tiles)
+
+        self._tiles = tiles
+        self.width = tiles.width
+        self.height = tiles.height
+
+        # The index is sized to the tiles - refile everything.
+        if hasattr(self, '_entities'):
+            self.reindex()
+
+    @property
+    def entities(self):
+        return self._entities
+
+    @entities.setter
+    def entities(self, entities):
+        self._entities = EntityList(self)
+        self.reindex()
+        self._entities.extend(entities)
+
+    def reindex(self):
+        """Rebuilds the lookup indexes from scratch for the current entities."""
+        self.index = SpatialIndex(self.width, self.height)
+        self.comps = ComponentIndex()
+        self.render_index = RenderIndex(self.width, self.height)
+
+        for e in self._entities:
+            self.register(e)
+
+    def register(self, e):
+        """Adds an entity to the lookup indexes. Called by the EntityList."""
+        if not isinstance(e, entity.Entity):
+            return
+
+        self.index.add(e)
+        self.comps.add(e)
+        self.render_index.add(e)
+        e.watch(self)
+
+    def unregister(self, e):
+        """Removes an entity from the lookup indexes. Called by the EntityList."""
+        if e not in self.index:
+            return
+
+        self.index.remove(e)
+        self.comps.remove(e)
+        self.render_index.remove(e)
+        e.unwatch(self)
+
+    def entity_changed(self, e):
+        """Called by an entity when its position, blocks or render order changed."""
+        self.index.update(e)
+        self.render_index.update(e)
+
+    def comps_changed(self, e):
+        """Called by an entity when a component was added or removed."""
+        self.comps.update(e)
+        self.render_index.update(e)
+
+    def with_comp(self, name):
+        """Returns a list of the entities that have the component. Only names in
+            comp_index.INDEXED_COMPS (plus 'actor') are kept.
+        """
+        return self.comps.get(name)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_entities'] = list(self._entities)
+        del state['index']
+        del state['comps']
+        del state['render_index']
+
+        # The render layers and floor cells are just caches of the tiles.
+        state.pop('layers', None)
+        state.pop('floor_cache', None)
+        return state
+
+    def __setstate__(self, state):
+        entities = state.pop('_entities')
+        self.__dict__.update(state)
+        self.layers = TileLayers(self)
+        self.floor_cache = None
+
+        self.entities = entities
+
     def rm_hero(self):
-        for e in self.entities:
-            if e.has_comp('human'):
-                self.entities.remove(e)
-                return True
+        for e in self.with_comp('human'):
+            self.entities.remove(e)
+            return True
         return False
 
     def find_stair(self, stair_char):
-        for e in self.entities:
+        stair_comp = 'stair_down' if stair_char == '>' else 'stair_up'
+
+        for e in self.with_comp(stair_comp):
             if e.char == stair_char:
                 return e
         return None
 
     def initialize_tiles(self):
-        return [[Tile(True) for y in range(self.height)] for x in range(self.width)]
+        return TileGrid(self.width, self.height, blocks=True)
 
     def blocks(self, x, y):
-        if self.tiles[x][y].blocks:
-            return True
-        return False
+        return bool(self.tiles.blocks[x, y])
 
     def mk_room(self):
         # random width and height
-        w = random.randint(config.room_min_len, config.room_max_len)
-        h = random.randint(config.room_min_len, config.room_max_len)
+        w = self.rng.randint(config.room_min_len, config.room_max_len)
+        h = self.rng.randint(config.room_min_len, config.room_max_len)
 
         # Random position w/o going out of the map boundaries
-        x = random.randint(0, self.width - w - 1)
-        y = random.randint(0, self.height - h - 1)
+        x = self.rng.randint(0, self.width - w - 1)
+        y = self.rng.randint(0, self.height - h - 1)
 
         # Generate new Rect
         return Rect(x, y, w, h)
 
+    def dig(self, xs, ys):
+        """Makes the tiles in the x and y slices passable in one go."""
+        self.tiles.blocks[xs, ys] = False
+        self.tiles.block_sight[xs, ys] = False
+        self.tiles.changed()
+
     def dig_room(self, rect):
         WALL_OFFSET = 1
-        # Go through the tiles in the rectangle and make them passable.
-        for x in range(rect.x1 + WALL_OFFSET, rect.x2 - WALL_OFFSET):
-
-            for y in range(rect.y1 + WALL_OFFSET, rect.y2 - WALL_OFFSET):
-
-                self.tiles[x][y].blocks = False
-                self.tiles[x][y].block_sight = False
+        self.dig(
+            slice(rect.x1 + WALL_OFFSET, rect.x2 - WALL_OFFSET),
+            slice(rect.y1 + WALL_OFFSET, rect.y2 - WALL_OFFSET)
+        )
 
     def mk_tunnel_simple(self, room1, room2, horz_first=True):
         x1, y1 = room1.center()
@@ -79,26 +196,28 @@ class Stage(object):
             self.dig_h_tunnel(x1, x2, y2)
 
     def dig_h_tunnel(self, x1, x2, y):
-        for x in range(min(x1, x2), max(x1, x2) + 1):
-            self.tiles[x][y].blocks = False
-            self.tiles[x][y].block_sight = False
+        self.dig(slice(min(x1, x2), max(x1, x2) + 1), y)
 
     def dig_v_tunnel(self, y1, y2, x):
-        for y in range(min(y1, y2), max(y1, y2) + 1):
-            self.tiles[x][y].blocks = False
-            self.tiles[x][y].block_sight = False
+        self.dig(x, slice(min(y1, y2), max(y1, y2) + 1))
 
     def mk_stage(self):
         # Procedurally generate a dungeon map
+        # The cells covered by the rooms so far, walls included. A room that
+        # touches any of them would intersect (see Rect.intersect).
+        occupied = np.zeros((self.width, self.height), dtype=bool)
+
         for _ in range(config.max_rooms):
             new_room = self.mk_room()
+            area = (
+                slice(new_room.x1, new_room.x2 + 1),
+                slice(new_room.y1, new_room.y2 + 1)
+            )
 
-            # Double check the other rooms to make sure there are no intersections.
-            for other_room in self.rooms:
-                if new_room.intersect(other_room):
-                    break
-            else:
+            # Make sure there are no intersections with the other rooms.
+            if not occupied[area].any():
                 # There are no intersections, valid room.
+                occupied[area] = True
                 self.dig_room(new_room)
 
                 # Get center coordinates
@@ -112,7 +231,7 @@ class Stage(object):
                     last_room = self.rooms[-1]
 
                     # Flip a coin to decide vertical first or horizontal first
-                    horz_first = bool(random.randint(0, 1))
+                    horz_first = bool(self.rng.randint(0, 1))
                     self.mk_tunnel_simple(last_room, new_room, horz_first)
                 else:
                     # Place stairs up in the first room
@@ -132,40 +251,61 @@ class Stage(object):
         for room in self.rooms:
             self.place_items(room)
 
+    def entities_at(self, x, y):
+        """Returns a list of all the entities on the tile."""
+        return self.index.at(x, y)
+
     def is_occupied(self, x, y):
         """Returns True if an entity is occupying the tile."""
-        return any([entity for entity in self.entities if entity.x == x and entity.y == y])
+        return self.index.is_occupied(x, y)
+
+    def floor_cells(self):
+        """ Returns an (n, 2) array of the (x, y) of every non-wall tile. The
+            array is kept until the tiles change.
+        """
+        tiles = self.tiles
+
+        if self.floor_cache is None or self.floor_cache[:2] != (tiles, tiles.version):
+            self.floor_cache = tiles, tiles.version, np.argwhere(~tiles.blocks)
+
+        return self.floor_cache[2]
 
     def get_random_open_spot(self):
         """Find a random non-wall, non-blocked spot on the stage.
             If we find a valid tile, return the (x, y) tuple for that tile.
             Else, return None
         """
-        while True:
+        # Random picks almost always land on a free tile, so try a few first.
+        for _ in range(OPEN_SPOT_TRIES):
             tile = self.get_random_non_wall_loc()
             if not tile:
                 return None
             elif not self.is_occupied(*tile):
                 return tile
 
+        # A crowded stage - pick from the floor tiles nothing is on.
+        cells = self.floor_cells()
+        free = cells[~self.index.occupied()[cells[:, 0], cells[:, 1]]]
+
+        if len(free):
+            x, y = self.rng.choice(free)
+            return int(x), int(y)
+        return None
+
     def get_random_non_wall_loc(self):
         """Find a random spot on the stage that is not a Wall."""
-        # Find all of the non-wall tiles
-        valid_tiles = []
-        for x in range(self.width):
-            for y in range(self.height):
-                if not self.tiles[x][y].blocks:
-                    valid_tiles.append((x, y))
+        valid_tiles = self.floor_cells()
 
         # Return a random valid tile
-        if valid_tiles:
-            return random.choice(valid_tiles)
+        if len(valid_tiles):
+            x, y = self.rng.choice(valid_tiles)
+            return int(x), int(y)
         return None
 
     def get_random_room_loc(self, room):
         """Find a random spot in a room."""
-        x = random.randint(room.x1 + config.NW_OFFSET, room.x2 - config.SE_OFFSET)
-        y = random.randint(room.y1 + config.NW_OFFSET, room.y2 - config.SE_OFFSET)
+        x = self.rng.randint(room.x1 + config.NW_OFFSET, room.x2 - config.SE_OFFSET)
+        y = self.rng.randint(room.y1 + config.NW_OFFSET, room.y2 - config.SE_OFFSET)
         return x, y
 
     def place_monsters(self):
@@ -183,7 +323,7 @@ class Stage(object):
             x, y = self.get_random_non_wall_loc()
 
             if not self.is_occupied(x, y):
-                monster = factory.rnd_monster(x, y)
+                monster = factory.rnd_monster(x, y, self.rng)
                 self.entities.append(monster)
 
     def place_items(self, room):
@@ -193,17 +333,17 @@ class Stage(object):
         # max_items_per_room = from_dungeon_lvl(config.max_items_weights, self.dungeon_lvl)
         max_items_per_room = 5
 
-        num_items = random.randint(0, max_items_per_room)
+        num_items = self.rng.randint(0, max_items_per_room)
 
         for _ in range(num_items):
             x, y = self.get_random_room_loc(room)
 
             if not self.is_occupied(x, y):
-                item = factory.rnd_item(x, y)
+                item = factory.rnd_item(x, y, self.rng)
                 self.entities.append(item)
 
     def place_stairs_down(self, x, y):
-        if self.tiles[x][y].blocks:
+        if self.blocks(x, y):
             raise ValueError('Stairs cannot go on Wall tile!')
 
         stair_down = stairs.StairDown(x, y, floor=self.dungeon_lvl + 1)
@@ -211,7 +351,7 @@ class Stage(object):
         return stair_down
 
     def place_stairs_up(self, x, y):
-        if self.tiles[x][y].blocks:
+        if self.blocks(x, y):
             raise ValueError('Stairs cannot go on Wall tile!')
 
         stair_up = stairs.StairUp(x, y, floor=self.dungeon_lvl - 1)
@@ -219,17 +359,11 @@ class Stage(object):
         return stair_up
 
     def get_blocker_at_loc(self, x, y):
-        """Scans through all entities on stage that match the x, y coordinates and
-            if an entity matches and blocks - we return it.
+        """Looks up the entities on the x, y tile and if one of them blocks - we
+            return it.
             Otherwise, returns None.
         """
-        blockers = [e for e in self.entities if e.x == x and e.y == y]
-        # blockers = [e for e in blockers if e.has_comp('blocks')]
-        blockers = [e for e in blockers if e.blocks]
-
-        if blockers:
-            return blockers.pop()
-        return None
+        return self.index.blocker_at(x, y)
 
     @classmethod
     def calc_dxdy(cls, src_x, src_y, dest_x, dest_y):
@@ -1,3 +1,14 @@
+import numpy as np
+
+# Layout of a single tile in a TileGrid. Each field becomes a boolean plane
+# when accessed on the whole grid, ie: grid.blocks[x, y]
+tile_dt = np.dtype([
+    ('blocks', bool),
+    ('block_sight', bool),
+    ('explored', bool),
+])
+
+
 class Tile(object):
     """ A tile on a map."""
     def __init__(self, blocks, block_sight=None):
@@ -13,3 +24,123 @@ class Tile(object):
         self.block_sight = block_sight
 
         self.explored = False
+
+
+class TileGrid(object):
+    """ Array-backed storage for all the tiles on a stage.
+        The tiles are kept in a (width, height) structured NumPy array so the
+        planes can be worked on as a whole. For compatibility, a single tile
+        can still be reached with grid[x][y] (or grid[x, y]), which returns a
+        TileView into the arrays.
+    """
+    def __init__(self, width, height, blocks=True):
+        self.data = np.zeros((width, height), dtype=tile_dt)
+        self.data['blocks'] = blocks
+        self.data['block_sight'] = blocks
+
+        # Bumped whenever blocks/block_sight change so caches built from the
+        # terrain know when to rebuild.
+        self.version = 0
+
+    @classmethod
+    def from_tiles(cls, tiles):
+        """Builds a TileGrid out of a list of lists of Tile objects (indexed [x][y])."""
+        width = len(tiles)
+        height = len(tiles[0]) if width else 0
+        grid = cls(width, height)
+
+        for x, column in enumerate(tiles):
+            for y, t in enumerate(column):
+                grid.data[x, y] = (t.blocks, t.block_sight, t.explored)
+
+        return grid
+
+    @property
+    def width(self):
+        return self.data.shape[0]
+
+    @property
+    def height(self):
+        return self.data.shape[1]
+
+    @property
+    def blocks(self):
+        return self.data['blocks']
+
+    @property
+    def block_sight(self):
+        return self.data['block_sight']
+
+    @property
+    def explored(self):
+        return self.data['explored']
+
+    def changed(self):
+        """Call after writing to the blocks/block_sight planes directly."""
+        self.version += 1
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        for x in range(self.width):
+            yield TileColumn(self, x)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            x, y = key
+            return TileView(self, x, y)
+        return TileColumn(self, key)
+
+
+class TileColumn(object):
+    """A single x column of a TileGrid so that grid[x][y] keeps working."""
+    __slots__ = ('grid', 'x')
+
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+    def __len__(self):
+        return self.grid.height
+
+    def __getitem__(self, y):
+        return TileView(self.grid, self.x, y)
+
+
+class TileView(object):
+    """ Looks and acts like a Tile, but reads and writes straight through to
+        the TileGrid arrays.
+    """
+    __slots__ = ('grid', 'x', 'y')
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.x = x
+        self.y = y
+
+    @property
+    def blocks(self):
+        return bool(self.grid.data['blocks'][self.x, self.y])
+
+    @blocks.setter
+    def blocks(self, value):
+        self.grid.data['blocks'][self.x, self.y] = value
+        self.grid.changed()
+
+    @property
+    def block_sight(self):
+        return bool(self.grid.data['block_sight'][self.x, self.y])
+
+    @block_sight.setter
+    def block_sight(self, value):
+        self.grid.data['block_sight'][self.x, self.y] = value
+        self.grid.changed()
+
+    @property
+    def explored(self):
+        return bool(self.grid.data['explored'][self.x, self.y])
+
+    @explored.setter
+    def explored(self, value):
+        self.grid.data['explored'][self.x, self.y] = value
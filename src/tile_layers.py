@@ -0,0 +1,44 @@
+import numpy as np
+import tcod
+from . import config
+
+
+class TileLayers(object):
+    """ The cells (glyph, foreground, background) a stage's tiles are drawn
+        with - one layer for tiles in view and one for remembered tiles, shaded
+        with config.colors. They are built once from the tiles and only rebuilt
+        when the tiles change, so a frame just picks cells out of them by the
+        fov mask.
+        Layers are indexed [y, x] like the console they're drawn on.
+    """
+    def __init__(self, stage):
+        self.stage = stage
+        self.tiles = None
+        self.version = None
+        self.lit = None
+        self.dark = None
+
+    def get(self):
+        """Returns the (lit, dark) layers for the stage's current tiles."""
+        tiles = self.stage.tiles
+
+        if self.tiles is not tiles or self.version != tiles.version:
+            wall = tiles.block_sight.T
+
+            self.lit = mk_layer(wall, config.colors['light_wall'], config.colors['light_ground'])
+            self.dark = mk_layer(wall, config.colors['dark_wall'], config.colors['dark_ground'])
+            self.tiles = tiles
+            self.version = tiles.version
+
+        return self.lit, self.dark
+
+
+def mk_layer(wall, wall_color, ground_color):
+    """Returns an array of console cells: a '#' in wall_color for walls, a '.'
+        in ground_color for everything else, all on black.
+    """
+    layer = np.zeros(wall.shape, dtype=tcod.console.rgb_graphic)
+    layer['ch'] = np.where(wall, ord('#'), ord('.'))
+    layer['fg'][wall] = tuple(wall_color)
+    layer['fg'][~wall] = tuple(ground_color)
+    return layer
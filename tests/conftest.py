@@ -0,0 +1,8 @@
+import pytest
+from ..src import config
+
+
+@pytest.fixture(autouse=True)
+def no_pregen(mocker):
+    # Tests make every stage in this process - no worker to spawn or clean up.
+    mocker.patch.object(config, 'pregen_stages', False)
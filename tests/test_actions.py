@@ -641,6 +641,7 @@ def test_StairUpAction__success_on_lower_level(test_game, hero):
     assert result.success
     assert result.msg == 'You ascend the stairs up.'
     assert test_game.redraw
+    assert test_game.stage is d.stages[0]
 
 
 """ Tests for StairDownAction """
@@ -679,6 +680,7 @@ def test_StairDownAction__next_stage_DNE(test_game, hero):
     assert result.success
     assert len(d.stages) == prev_stages + 1
     assert test_game.redraw
+    assert test_game.stage is d.get_stage()
 
 
 def test_StairDownAction__next_stage_exists(test_game, hero):
@@ -699,6 +701,22 @@ def test_StairDownAction__next_stage_exists(test_game, hero):
     assert test_game.redraw
 
 
+def test_StairDownAction__revisit_does_not_add_stage(test_game, hero):
+    d = test_game.dungeon
+    d.mk_next_stage()
+    prev_stages = len(d.stages)
+
+    s = d.get_stage().find_stair('>')
+    d.move_hero(0, s.x, s.y)
+
+    action = actions.StairDownAction()
+    result = action.perform(dungeon=d, entity=hero, game=test_game)
+
+    assert result.success
+    assert len(d.stages) == prev_stages
+    assert test_game.stage is d.stages[1]
+
+
 """ Tests for LevelUpAction """
 
 
@@ -1262,6 +1280,50 @@ def test_MoveAStarAction__target_to_side(fov_stage):
 # def test_MoveAStarAction__target_is_same_as_origin(fov_stage):
 
 
+""" Tests for MoveFlowAction """
+
+
+def test_MoveFlowAction_init(fov_stage):
+    action = actions.MoveFlowAction(
+        stage=fov_stage,
+        entity=fov_stage.orc_ref,
+        target=fov_stage.hero_ref
+    )
+    assert isinstance(action, actions.Action)
+    assert action.consumes_turn
+
+
+def test_MoveFlowAction__target_around_wall(fov_stage):
+    fov_stage.hero_ref.x = 1
+    fov_stage.hero_ref.y = 4
+
+    action = actions.MoveFlowAction(
+        stage=fov_stage,
+        entity=fov_stage.orc_ref,
+        target=fov_stage.hero_ref
+    )
+    result = action.perform()
+    assert isinstance(result.alt, actions.WalkAction)
+    assert result.alt.dx == -1
+    assert result.alt.dy == 1
+
+
+def test_MoveFlowAction__no_step__returns_MoveTowardAction(fov_stage):
+    # Wall the orc in
+    fov_stage.tiles[0][1].blocks = True
+    fov_stage.tiles[2][0].blocks = True
+    fov_stage.hero_ref.x = 6
+    fov_stage.hero_ref.y = 5
+
+    action = actions.MoveFlowAction(
+        stage=fov_stage,
+        entity=fov_stage.orc_ref,
+        target=fov_stage.hero_ref
+    )
+    result = action.perform()
+    assert isinstance(result.alt, actions.MoveTowardAction)
+
+
 """ Tests for MoveTowardAction"""
 
 
@@ -0,0 +1,74 @@
+import json
+from ..src import benchmark
+
+
+def test_spawn__places_entities_on_free_tiles():
+    g, _ = benchmark.mk_game('empty', seed=1)
+    placed = benchmark.spawn(g.stage, 'orc', 10)
+
+    assert placed == 10
+    assert len(g.stage.with_comp('ai')) == 10
+
+
+def test_spawn__limited_by_free_tiles():
+    g, _ = benchmark.mk_game('empty', seed=1)
+    free = len(benchmark.free_tiles(g.stage))
+
+    assert benchmark.spawn(g.stage, 'orc', free + 10) == free
+
+
+def test_clear_stage__keeps_hero_and_stairs():
+    g, _ = benchmark.mk_game('descend', seed=1)
+    benchmark.clear_stage(g)
+
+    assert len(g.stage.entities) == 3
+    assert g.hero in g.stage.entities
+
+
+def test_open_stage__fits_amt():
+    g, _ = benchmark.mk_game('empty', seed=1)
+    stage = benchmark.open_stage(g, 5000)
+
+    assert g.stage is stage
+    assert g.dungeon.get_stage() is stage
+    assert len(benchmark.free_tiles(stage)) >= 2 * 5000
+
+
+def test_mk_game__monsters_1000_places_all():
+    g, _ = benchmark.mk_game('monsters_1000', seed=1)
+    assert len(g.stage.with_comp('ai')) == 1000
+
+
+def test_mk_game__items_places_all():
+    g, _ = benchmark.mk_game('items', seed=1)
+    assert len(g.stage.with_comp('item')) == 500
+
+
+def test_run_scenario__results():
+    result = benchmark.run_scenario('monsters_10', seed=1, turns=5)
+
+    assert result['scenario'] == 'monsters_10'
+    assert result['turns'] == 5
+    assert result['actions'] >= 5
+    assert set(result['turn_ms']) == {'p50', 'p90', 'p99', 'max'}
+    assert result['alloc_peak_kib'] > 0
+
+
+def test_run_scenario__seeded_runs_match():
+    a = benchmark.run_scenario('monsters_10', seed=1, turns=5, allocs=False)
+    b = benchmark.run_scenario('monsters_10', seed=1, turns=5, allocs=False)
+    assert a['actions'] == b['actions']
+
+
+def test_run_scenario__descend_takes_stairs():
+    result = benchmark.run_scenario('descend', seed=1, turns=3, allocs=False)
+    assert result['turns'] == 3
+
+
+def test_main__writes_json(tmp_path):
+    out = tmp_path / 'bench.json'
+    benchmark.main(['--scenario', 'empty', '--turns', '2', '--no-allocs', '--out', str(out)])
+
+    report = json.loads(out.read_text())
+    assert report['seed'] == benchmark.DEFAULT_SEED
+    assert [s['scenario'] for s in report['scenarios']] == ['empty']
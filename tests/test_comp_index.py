@@ -0,0 +1,155 @@
+import pytest
+from ..src import comp_index
+from ..src import components
+from ..src import factory
+from ..src import player
+from ..src import stages
+
+
+@pytest.fixture
+def index():
+    return comp_index.ComponentIndex()
+
+
+@pytest.fixture
+def orc():
+    return factory.mk_entity('orc', 0, 0)
+
+
+@pytest.fixture
+def potion():
+    return factory.mk_entity('healing_potion', 0, 0)
+
+
+"""Tests for class ComponentIndex(object):"""
+
+
+def test_ComponentIndex_init__all_empty(index):
+    for name in comp_index.INDEXED_COMPS + ('actor',):
+        assert index.get(name) == []
+
+
+def test_ComponentIndex_add__monster(index, orc):
+    index.add(orc)
+    assert index.get('ai') == [orc]
+    assert index.get('fighter') == [orc]
+    assert index.get('actor') == [orc]
+    assert index.get('item') == []
+
+
+def test_ComponentIndex_add__hero_is_actor(index):
+    hero = player.Player()
+    index.add(hero)
+    assert index.get('human') == [hero]
+    assert index.get('actor') == [hero]
+
+
+def test_ComponentIndex_add__item_is_not_actor(index, potion):
+    index.add(potion)
+    assert index.get('item') == [potion]
+    assert index.get('actor') == []
+
+
+def test_ComponentIndex_add__keeps_order(index, orc, potion):
+    troll = factory.mk_entity('troll', 0, 0)
+    index.add(orc)
+    index.add(potion)
+    index.add(troll)
+    assert index.get('actor') == [orc, troll]
+
+
+def test_ComponentIndex_remove(index, orc):
+    index.add(orc)
+    index.remove(orc)
+    assert index.get('ai') == []
+    assert index.get('actor') == []
+
+
+def test_ComponentIndex_update__comp_removed(index, orc):
+    index.add(orc)
+    orc.components.pop('ai')
+    index.update(orc)
+    assert index.get('ai') == []
+    assert index.get('actor') == []
+    assert index.get('fighter') == [orc]
+
+
+def test_ComponentIndex_update__comp_added(index, orc):
+    index.add(orc)
+    orc.components['item'] = components.Item(orc)
+    index.update(orc)
+    assert index.get('item') == [orc]
+
+
+"""Tests for the Stage keeping its ComponentIndex current"""
+
+
+def test_Stage_with_comp__entity_added(orc):
+    m = stages.Stage(10, 10)
+    m.entities.append(orc)
+    assert m.with_comp('actor') == [orc]
+
+
+def test_Stage_with_comp__entity_removed(orc):
+    m = stages.Stage(10, 10)
+    m.entities.append(orc)
+    m.entities.remove(orc)
+    assert m.with_comp('actor') == []
+
+
+def test_Stage_with_comp__rm_comp(orc):
+    m = stages.Stage(10, 10)
+    m.entities.append(orc)
+    orc.rm_comp('ai')
+    assert m.with_comp('actor') == []
+
+
+def test_Stage_with_comp__add_comp(orc):
+    m = stages.Stage(10, 10)
+    m.entities.append(orc)
+    orc.add_comp(item=components.Item(orc))
+    assert m.with_comp('item') == [orc]
+
+
+def test_Stage_with_comp__new_comp_attribute(orc):
+    m = stages.Stage(10, 10)
+    m.entities.append(orc)
+    orc.item = components.Item(orc)
+    assert m.with_comp('item') == [orc]
+
+
+def test_Stage_with_comp__replaced_comp_attribute(orc):
+    m = stages.Stage(10, 10)
+    m.entities.append(orc)
+    orc.ai = components.ConfusedBehavior(orc, orc.ai)
+    assert m.with_comp('actor') == [orc]
+
+
+def test_ComponentIndex_actor_version__add_actor_bumps(index, orc):
+    index.add(orc)
+    assert index.actor_version == 1
+
+
+def test_ComponentIndex_actor_version__add_item_unchanged(index, potion):
+    index.add(potion)
+    assert index.actor_version == 0
+
+
+def test_ComponentIndex_actor_version__remove_actor_bumps(index, orc):
+    index.add(orc)
+    index.remove(orc)
+    assert index.actor_version == 2
+
+
+def test_ComponentIndex_actor_version__update_losing_ai_bumps(index, orc):
+    index.add(orc)
+    orc.rm_comp('ai')
+    index.update(orc)
+    assert index.actor_version == 2
+
+
+def test_ComponentIndex_actor_version__update_other_comp_unchanged(index, orc):
+    index.add(orc)
+    orc.rm_comp('fighter')
+    index.update(orc)
+    assert index.actor_version == 1
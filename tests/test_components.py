@@ -462,3 +462,20 @@ def test_EnergyMeter__burned_out__insufficient_energy_returns_True():
     am = components.EnergyMeter(threshold=100)
     am.add_energy(10)
     assert am.burned_out()
+
+
+def test_EnergyMeter__turns_until_ready__empty():
+    am = components.EnergyMeter(threshold=200)
+    assert am.turns_until_ready(100) == 2
+
+
+def test_EnergyMeter__turns_until_ready__rounds_up():
+    am = components.EnergyMeter(threshold=110)
+    am.add_energy(5)
+    assert am.turns_until_ready(100) == 2
+
+
+def test_EnergyMeter__turns_until_ready__at_least_1():
+    am = components.EnergyMeter(threshold=75)
+    am.add_energy(80)
+    assert am.turns_until_ready(100) == 1
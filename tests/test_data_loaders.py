@@ -1,46 +1,313 @@
 import os
-import shelve
-from pytest_mock import mocker
+import pickle
+import pytest
+import numpy as np
+from ..src import config
 from ..src import data_loaders
 from ..src import game
+from ..src import stage_store
+from ..src import stages
 
 TEMP_DIR = 'temp'
 TEMP_FILE = TEMP_DIR + '/savegame.dat'
 
 
-def test_save_game():
-    g = game.Game()
-    # dungeon, msg_log, state, turns = game.get_game_data()
-
-    # Check if temp dir exists
+@pytest.fixture
+def savefile():
     if not os.path.exists(TEMP_DIR):
         os.mkdir(TEMP_DIR)
 
-    data_loaders.save_game(TEMP_FILE, g)
-
-    assert os.path.exists(TEMP_FILE)
+    yield TEMP_FILE
 
     # clean up the file
-    os.remove(TEMP_FILE)
+    if os.path.exists(TEMP_FILE):
+        os.remove(TEMP_FILE)
+
+
+@pytest.fixture
+def deep_game():
+    g = game.Game()
+    g.dungeon.mk_next_stage()
+    g.dungeon.mk_next_stage()
+    return g
 
 
-def test_save_game__calls_shelve(mocker):
+@pytest.fixture
+def saved_game(savefile):
     g = game.Game()
+    g.turns = 42
+    g.msg_log.add('Hello')
+    g.stage.tiles.explored[3:6, 4:8] = True
+    data_loaders.save_game(savefile, g)
+    return g
+
+
+def test_save_game(savefile):
+    g = game.Game()
+    data_loaders.save_game(savefile, g)
+    assert os.path.exists(savefile)
+
+
+def test_save_game__no_temp_file_left(saved_game, savefile):
+    assert not os.path.exists(savefile + '.tmp')
 
-    mocker.patch('shelve.open')
-    data_loaders.save_game(TEMP_FILE, game=g)
 
-    shelve.open.assert_called_once()
-    shelve.open.assert_called_with(TEMP_FILE, 'n')
+def test_save_game__header(saved_game, savefile):
+    with open(savefile, 'rb') as f:
+        magic, version = data_loaders.HEADER.unpack(f.read(data_loaders.HEADER.size))
 
+    assert magic == data_loaders.MAGIC
+    assert version == data_loaders.VERSION
 
-def test_load_game__calls_shelve(mocker):
-    mocker.patch('shelve.open')
-    data_loaders.load_game('tests/testsavefile.dat')
 
-    shelve.open.assert_called_with('tests/testsavefile.dat', 'r')
+def test_save_game__fov_map_not_saved(saved_game, savefile):
+    version, record, stage_data = data_loaders.read_save(savefile)
+    assert 'fov_map' not in record
 
 
 def test_load_game__file_DNE__returns_None():
     result = data_loaders.load_game('fuckwat.dat')
     assert result is None
+
+
+def test_load_game__not_a_save__raises_ValueError(savefile):
+    with open(savefile, 'wb') as f:
+        f.write(b'not a save file')
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__truncated__raises_ValueError(saved_game, savefile):
+    with open(savefile, 'rb') as f:
+        data = f.read()
+    with open(savefile, 'wb') as f:
+        f.write(data[:-10])
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def write_save(savefile, record_buf):
+    # A save with a good header and index around the given game record.
+    with open(savefile, 'wb') as f:
+        f.write(data_loaders.HEADER.pack(data_loaders.MAGIC, data_loaders.VERSION))
+        f.write(data_loaders.INDEX.pack(data_loaders.HEADER.size + data_loaders.INDEX.size))
+        f.write(data_loaders.SECTION.pack(len(record_buf)))
+        f.write(record_buf)
+
+
+def test_load_game__corrupt_record__raises_ValueError(savefile):
+    write_save(savefile, b'\xff' * 5)
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__record_missing_keys__raises_ValueError(savefile):
+    write_save(savefile, pickle.dumps({'turns': 1}))
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__bad_stage_index__raises_ValueError(saved_game, savefile):
+    version, record, stage_data = data_loaders.read_save(savefile)
+    del record['stages'][0]['entities']
+    write_save(savefile, pickle.dumps(record))
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__corrupt_entities__raises_ValueError(saved_game, savefile):
+    version, record, stage_data = data_loaders.read_save(savefile)
+    offset, size = record['stages'][0]['entities']
+    del stage_data
+
+    with open(savefile, 'r+b') as f:
+        f.seek(offset)
+        f.write(b'\xff' * size)
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__newer_version__raises_ValueError(saved_game, savefile):
+    with open(savefile, 'r+b') as f:
+        f.write(data_loaders.HEADER.pack(data_loaders.MAGIC, data_loaders.VERSION + 1))
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__restores_game_state(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    assert g.turns == 42
+    assert g.msg_log.messages == saved_game.msg_log.messages
+    assert g.state == saved_game.state
+
+
+def test_load_game__restores_tiles(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    assert np.array_equal(g.stage.tiles.data, saved_game.stage.tiles.data)
+
+
+def test_load_game__restores_rooms(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    old = [(r.x1, r.y1, r.x2, r.y2) for r in saved_game.stage.rooms]
+    new = [(r.x1, r.y1, r.x2, r.y2) for r in g.stage.rooms]
+    assert new == old
+
+
+def test_load_game__restores_entities(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    old = [(e.name, e.x, e.y) for e in saved_game.stage.entities]
+    new = [(e.name, e.x, e.y) for e in g.stage.entities]
+    assert new == old
+
+
+def test_load_game__hero_is_on_stage_once(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    heroes = [e for e in g.stage.entities if e is g.hero]
+    assert len(heroes) == 1
+
+
+def test_load_game__hero_components_point_at_hero(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    assert g.hero.fighter.owner is g.hero
+
+
+def test_load_game__rebuilds_fov_map(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    assert g.fov_map.width == g.stage.width
+    assert g.fov_map.height == g.stage.height
+
+
+def test_load_game__stage_is_dungeon_stage(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    assert g.stage is g.dungeon.get_stage()
+
+
+def test_load_game__runs_migrations(saved_game, savefile, mocker):
+    # Pretend the game moved on a version, with a hook to upgrade the save.
+    version = data_loaders.VERSION
+
+    def upgrade(record, stage_data):
+        record['turns'] = 7
+        return record, stage_data
+
+    mocker.patch.object(data_loaders, 'VERSION', version + 1)
+    mocker.patch.dict(data_loaders.MIGRATIONS, {version: upgrade})
+    g = data_loaders.load_game(savefile)
+    assert g.turns == 7
+
+
+def test_load_game__missing_migration__raises_ValueError(saved_game, savefile, mocker):
+    mocker.patch.object(data_loaders, 'VERSION', data_loaders.VERSION + 1)
+
+    with pytest.raises(ValueError):
+        data_loaders.load_game(savefile)
+
+
+def test_load_game__only_current_stage_loaded(deep_game, savefile):
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+
+    assert isinstance(g.dungeon.stages[0], stages.Stage)
+    assert isinstance(g.dungeon.stages[1], stage_store.SavedStage)
+    assert isinstance(g.dungeon.stages[2], stage_store.SavedStage)
+
+
+def test_load_game__stage_loaded_on_demand(deep_game, savefile):
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+
+    stage = g.dungeon.stage_at(2)
+    assert isinstance(stage, stages.Stage)
+    assert g.dungeon.stages[2] is stage
+    assert np.array_equal(stage.tiles.data, deep_game.dungeon.stages[2].tiles.data)
+
+
+def test_load_game__move_downstairs_loads_stage(deep_game, savefile):
+    stair = deep_game.stage.find_stair('>')
+    deep_game.hero.x, deep_game.hero.y = stair.x, stair.y
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+
+    assert g.dungeon.move_downstairs()
+    assert isinstance(g.dungeon.stages[1], stages.Stage)
+    assert g.hero in g.dungeon.stages[1].entities
+
+
+def test_save_game__unloaded_stages_copied(deep_game, savefile):
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+    data_loaders.save_game(savefile, g)
+
+    g = data_loaders.load_game(savefile)
+    stage = g.dungeon.stage_at(1)
+    old = deep_game.dungeon.stages[1]
+    assert np.array_equal(stage.tiles.data, old.tiles.data)
+    assert [e.name for e in stage.entities] == [e.name for e in old.entities]
+
+
+def test_load_game__does_not_generate_game(saved_game, savefile, mocker):
+    mocker.patch.object(game.Game, '__init__')
+    data_loaders.load_game(savefile)
+    game.Game.__init__.assert_not_called()
+
+
+def test_load_game__keeps_dungeon_seed(saved_game, savefile):
+    g = data_loaders.load_game(savefile)
+    assert g.dungeon.rng.seed == saved_game.dungeon.rng.seed
+
+
+def test_save_game__spilled_stages_saved(deep_game, savefile, mocker):
+    mocker.patch.object(config, 'max_loaded_stages', 1)
+    deep_game.dungeon.evict()
+    assert isinstance(deep_game.dungeon.stages[1], stage_store.SavedStage)
+
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+    old = deep_game.dungeon.stage_at(1)
+    assert np.array_equal(g.dungeon.stage_at(1).tiles.data, old.tiles.data)
+
+
+def test_save_game__over_loaded_save(deep_game, savefile):
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+    data_loaders.save_game(savefile, g)
+
+    g = data_loaders.load_game(savefile)
+    for i in (1, 2):
+        old = deep_game.dungeon.stages[i]
+        assert np.array_equal(g.dungeon.stage_at(i).tiles.data, old.tiles.data)
+
+
+def test_save_game__old_save_not_mapped_when_replaced(deep_game, savefile, mocker):
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+    replace = os.replace
+
+    def check_replace(src, dst):
+        # Some OSes can't replace a file that is memory-mapped.
+        for stage in g.dungeon.stages:
+            if isinstance(stage, stage_store.SavedStage):
+                assert isinstance(stage.tile_buf, bytes)
+                assert isinstance(stage.entity_buf, bytes)
+        replace(src, dst)
+
+    mocker.patch.object(data_loaders.os, 'replace', check_replace)
+    data_loaders.save_game(savefile, g)
+
+
+def test_save_game__stages_mapped_from_new_save(deep_game, savefile):
+    data_loaders.save_game(savefile, deep_game)
+    g = data_loaders.load_game(savefile)
+    data_loaders.save_game(savefile, g)
+
+    stage = g.dungeon.stages[1]
+    assert isinstance(stage, stage_store.SavedStage)
+    assert stage.source == os.path.abspath(savefile)
+    assert np.array_equal(stage.load().tiles.data, deep_game.dungeon.stages[1].tiles.data)
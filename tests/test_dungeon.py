@@ -1,8 +1,13 @@
+import random
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 import pytest
 from pytest_mock import mocker
+from ..src import config
 from ..src import dungeon
 from ..src import stages
 from ..src import player
+from ..src.rng import RNG
 
 
 @pytest.fixture
@@ -255,3 +260,196 @@ def test_move_hero__diff_floor_dungeon_lvl_updated(hero):
     dest_x, dest_y = d.stages[dest_stage_index].get_random_open_spot()
     d.move_hero(dest_stage_index=dest_stage_index, dest_x=dest_x, dest_y=dest_y)
     assert d.current_stage == dest_stage_index
+
+
+def test_Dungeon_restore__keeps_stages(hero):
+    d = dungeon.Dungeon(hero)
+    d.mk_next_stage()
+    restored = dungeon.Dungeon.restore(hero, d.stages, 1)
+    assert restored.stages is d.stages
+    assert restored.get_stage() is d.stages[1]
+    assert restored.hero is hero
+
+
+""" Tests for making stages ahead of time """
+
+
+def test_generate_stage__same_seed_same_stage():
+    s1 = dungeon.generate_stage(40, 30, 2, 'seed')
+    s2 = dungeon.generate_stage(40, 30, 2, 'seed')
+    assert (s1.tiles.data == s2.tiles.data).all()
+    assert [(e.name, e.x, e.y) for e in s1.entities] == [(e.name, e.x, e.y) for e in s2.entities]
+
+
+def test_generate_stage__populated():
+    stage = dungeon.generate_stage(40, 30, 2, 'seed')
+    assert stage.dungeon_lvl == 2
+    assert stage.find_stair('<')
+    assert stage.find_stair('>')
+
+
+def test_generate_stage__leaves_global_random_alone():
+    random.seed(7)
+    expected = random.random()
+
+    random.seed(7)
+    dungeon.generate_stage(40, 30, 2, 'seed')
+    assert random.random() == expected
+
+
+def test_Dungeon_stage_seed__differs_by_depth(hero):
+    d = dungeon.Dungeon(hero, RNG(1))
+    assert d.stage_seed(2) != d.stage_seed(3)
+
+
+def test_Dungeon_init__same_seed_same_stages(hero):
+    d1 = dungeon.Dungeon(hero, RNG(3))
+    d2 = dungeon.Dungeon(player.get_hero(), RNG(3))
+    assert (d1.stages[0].tiles.data == d2.stages[0].tiles.data).all()
+
+
+def test_Dungeon_init__starts_next_stage(mocker, hero):
+    workers = mocker.Mock()
+    mocker.patch.object(dungeon, 'get_pool', return_value=workers)
+
+    d = dungeon.Dungeon(hero, RNG(1))
+    workers.submit.assert_called_once()
+    assert 2 in d.pending
+
+
+def test_Dungeon_pregen_next_stage__turned_off(mocker, hero):
+    mocker.patch.object(config, 'pregen_stages', False)
+    d = dungeon.Dungeon(hero)
+    assert d.pending == {}
+
+
+def test_shutdown_pool(mocker):
+    workers = mocker.Mock()
+    mocker.patch.object(dungeon, 'pool', workers)
+
+    dungeon.shutdown_pool()
+    workers.shutdown.assert_called_once()
+    assert dungeon.pool is None
+
+
+def test_get_pool__turned_off_returns_None():
+    assert dungeon.get_pool() is None
+
+
+def test_Dungeon_pregen_next_stage__not_on_deepest_stage(mocker, hero):
+    d = dungeon.Dungeon(hero)
+    d.mk_next_stage()
+
+    workers = mocker.Mock()
+    mocker.patch.object(dungeon, 'get_pool', return_value=workers)
+    d.pending.clear()
+    d.pregen_next_stage()
+    workers.submit.assert_not_called()
+
+
+def test_Dungeon_mk_next_stage__takes_pregenerated_stage(hero):
+    d = dungeon.Dungeon(hero)
+    stage = stages.Stage(20, 20, 2)
+    future = Future()
+    future.set_result(stage)
+    d.pending = {2: future}
+
+    d.mk_next_stage()
+    assert d.stages[1] is stage
+    assert d.pending == {}
+
+
+def test_Dungeon_mk_next_stage__broken_worker_makes_stage_here(mocker, hero):
+    mocker.patch.object(dungeon, 'pool_broken', False)
+    d = dungeon.Dungeon(hero, RNG(2))
+    future = Future()
+    future.set_exception(BrokenProcessPool())
+    d.pending = {2: future}
+
+    d.mk_next_stage()
+    expected = dungeon.generate_stage(config.stage_width, config.stage_height, 2, d.stage_seed(2))
+    assert (d.stages[1].tiles.data == expected.tiles.data).all()
+    assert dungeon.pool_broken
+
+
+""" Tests for the stage store """
+
+
+def test_Dungeon_stage_at__makes_missing_stages(hero):
+    d = dungeon.Dungeon(hero)
+    stage = d.stage_at(2)
+    assert len(d.stages) == 3
+    assert stage.dungeon_lvl == 3
+
+
+def test_Dungeon_stage_at__reuses_stage(hero):
+    d = dungeon.Dungeon(hero)
+    assert d.stage_at(1) is d.stage_at(1)
+    assert len(d.stages) == 2
+
+
+def test_Dungeon_evict__spills_least_recently_used(mocker, hero):
+    mocker.patch.object(config, 'max_loaded_stages', 2)
+    d = dungeon.Dungeon(hero)
+    d.stage_at(1)
+    d.stage_at(2)
+
+    assert not isinstance(d.stages[1], stages.Stage)
+    assert isinstance(d.stages[2], stages.Stage)
+    assert list(d.loaded) == [0, 2]
+
+
+def test_Dungeon_evict__keeps_current_stage(mocker, hero):
+    mocker.patch.object(config, 'max_loaded_stages', 1)
+    d = dungeon.Dungeon(hero)
+    d.stage_at(1)
+    d.stage_at(2)
+    assert d.stages[0] is d.get_stage()
+    assert isinstance(d.stages[0], stages.Stage)
+
+
+def test_Dungeon_stage_at__loads_spilled_stage(mocker, hero):
+    mocker.patch.object(config, 'max_loaded_stages', 2)
+    d = dungeon.Dungeon(hero)
+    old = d.stage_at(1)
+    d.stage_at(2)
+
+    stage = d.stage_at(1)
+    assert isinstance(stage, stages.Stage)
+    assert (stage.tiles.data == old.tiles.data).all()
+    assert [(e.name, e.x, e.y) for e in stage.entities] == [(e.name, e.x, e.y) for e in old.entities]
+
+
+def test_Dungeon_stage_at__revisits_dont_grow_spill_file(mocker, hero):
+    mocker.patch.object(config, 'max_loaded_stages', 2)
+    d = dungeon.Dungeon(hero)
+    d.stage_at(1)
+    d.stage_at(2)
+    d.stage_at(1)
+    size = d.spill_file.size
+
+    for _ in range(20):
+        d.stage_at(2)
+        d.stage_at(1)
+
+    # Each reloaded stage's old copy is reused, not piled up.
+    assert d.spill_file.size <= 2 * size
+    assert len(d.spilled) == 1
+
+
+def test_Dungeon_move_downstairs__revisit_reuses_stage(hero):
+    d = dungeon.Dungeon(hero)
+    stair = d.get_stage().find_stair('>')
+    hero.x, hero.y = stair.x, stair.y
+    assert d.move_downstairs()
+    below = d.get_stage()
+
+    stair = below.find_stair('<')
+    hero.x, hero.y = stair.x, stair.y
+    assert d.move_upstairs()
+
+    stair = d.get_stage().find_stair('>')
+    hero.x, hero.y = stair.x, stair.y
+    assert d.move_downstairs()
+    assert d.get_stage() is below
+    assert len(d.stages) == 2
@@ -0,0 +1,120 @@
+import pytest
+import tcod
+from ..src import actions
+from ..src import config
+from ..src import engine
+from ..src import factory
+from ..src import game
+from ..src import headless
+from ..src import hero_input
+
+
+@pytest.fixture
+def test_game():
+    return game.Game()
+
+
+@pytest.fixture
+def monsters(test_game):
+    orcs = [factory.mk_entity('orc', 0, 0) for _ in range(5)]
+    test_game.stage.entities.extend(orcs)
+    return orcs
+
+
+def mk_engine(g, script):
+    return engine.Engine(g, headless.NullRenderEngine(), hero_input.ScriptedInput(script), autosave=False)
+
+
+def test_Engine_play_game__one_frame_per_hero_action(test_game, monsters):
+    eng = mk_engine(test_game, [actions.WaitAction()] * 3)
+    eng.play_game()
+
+    # 3 waits and the exit, no matter how many monsters acted in between.
+    assert eng.render_eng.frames == 4
+
+
+def test_Engine_play_game__anim_fps_renders_monster_turns(test_game, monsters, mocker):
+    mocker.patch.object(config, 'anim_fps', 1000000)
+    eng = mk_engine(test_game, [actions.WaitAction()] * 3)
+    eng.play_game()
+
+    assert eng.render_eng.frames > 4
+
+
+def test_Engine_play_game__max_turns(test_game, monsters):
+    eng = mk_engine(test_game, [actions.WaitAction()] * 10)
+    eng.play_game(max_turns=3)
+    assert test_game.turns == 3
+
+
+def test_Engine_update_fov__only_recomputes_when_hero_moves(test_game, mocker):
+    eng = mk_engine(test_game, [])
+    recompute = mocker.patch.object(engine, 'recompute_fov')
+
+    eng.update_fov()
+    eng.update_fov()
+    assert recompute.call_count == 1
+
+    test_game.hero.x += 1
+    eng.update_fov()
+    assert recompute.call_count == 2
+
+
+def test_Engine_update_fov__redraw_rebuilds_fov_map(test_game):
+    eng = mk_engine(test_game, [])
+    old_map = test_game.fov_map
+
+    eng.update_fov()
+    assert test_game.fov_map is not old_map
+    assert test_game.redraw is False
+
+
+def test_wait_for_menu_key__returns_key(mocker):
+    events = [tcod.event.MouseMotion(), tcod.event.KeyDown(scancode=0, sym=tcod.event.KeySym.N, mod=0)]
+    mocker.patch.object(tcod.event, 'wait', return_value=events)
+    assert engine.wait_for_menu_key() == 'n'
+
+
+def test_wait_for_menu_key__quit(mocker):
+    mocker.patch.object(tcod.event, 'wait', return_value=[tcod.event.Quit()])
+    assert engine.wait_for_menu_key() == 'quit'
+
+
+def window_event(type):
+    return tcod.event.WindowEvent(type=type, window_id=0, data=(0, 0))
+
+
+def test_wait_for_menu_key__resized(mocker):
+    event = tcod.event.WindowResized(type='WindowResized', window_id=0, data=(10, 10))
+    mocker.patch.object(tcod.event, 'wait', return_value=[event])
+    assert engine.wait_for_menu_key() == 'resize'
+
+
+def test_wait_for_menu_key__exposed_returns_None(mocker):
+    mocker.patch.object(tcod.event, 'wait', return_value=[window_event('WindowExposed')])
+    assert engine.wait_for_menu_key() is None
+
+
+def test_wait_for_menu_key__skips_other_window_events(mocker):
+    events = [
+        window_event('WindowEnter'), window_event('WindowFocusLost'),
+        tcod.event.KeyDown(scancode=0, sym=tcod.event.KeySym.N, mod=0)
+    ]
+    mocker.patch.object(tcod.event, 'wait', return_value=events)
+    assert engine.wait_for_menu_key() == 'n'
+
+
+def test_FrameCap_wait__no_cap_doesnt_sleep(mocker):
+    sleep = mocker.patch.object(engine.time, 'sleep')
+    cap = engine.FrameCap(0)
+    cap.wait()
+    cap.wait()
+    sleep.assert_not_called()
+
+
+def test_FrameCap_wait__sleeps_between_frames(mocker):
+    sleep = mocker.patch.object(engine.time, 'sleep')
+    cap = engine.FrameCap(10)
+    cap.wait()
+    cap.wait()
+    assert 0 < sleep.call_args[0][0] <= 0.1
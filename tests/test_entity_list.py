@@ -0,0 +1,72 @@
+import pytest
+from ..src import factory
+from ..src import stages
+
+
+@pytest.fixture
+def stage():
+    return stages.Stage(10, 10)
+
+
+@pytest.fixture
+def orc():
+    return factory.mk_entity('orc', 2, 3)
+
+
+"""Tests for class EntityList(list):"""
+
+
+def test_EntityList_is_a_list(stage):
+    assert isinstance(stage.entities, list)
+    assert stage.entities == []
+
+
+def test_EntityList_append__indexes(stage, orc):
+    stage.entities.append(orc)
+    assert stage.entities == [orc]
+    assert stage.entities.at(2, 3) == [orc]
+
+
+def test_EntityList_extend__indexes(stage, orc):
+    potion = factory.mk_entity('healing_potion', 4, 4)
+    stage.entities.extend([orc, potion])
+    assert stage.entities.at(2, 3) == [orc]
+    assert stage.entities.at(4, 4) == [potion]
+
+
+def test_EntityList_insert__indexes(stage, orc):
+    stage.entities.insert(0, orc)
+    assert stage.entities.at(2, 3) == [orc]
+
+
+def test_EntityList_remove__unindexes(stage, orc):
+    stage.entities.append(orc)
+    stage.entities.remove(orc)
+    assert stage.entities.at(2, 3) == []
+
+
+def test_EntityList_pop__unindexes(stage, orc):
+    stage.entities.append(orc)
+    assert stage.entities.pop() is orc
+    assert stage.entities.at(2, 3) == []
+
+
+def test_EntityList_clear__unindexes(stage, orc):
+    stage.entities.append(orc)
+    stage.entities.clear()
+    assert stage.entities == []
+    assert stage.entities.at(2, 3) == []
+
+
+def test_EntityList_setitem__reindexes(stage, orc):
+    troll = factory.mk_entity('troll', 5, 5)
+    stage.entities.append(orc)
+    stage.entities[0] = troll
+    assert stage.entities.at(2, 3) == []
+    assert stage.entities.at(5, 5) == [troll]
+
+
+def test_EntityList_delitem__unindexes(stage, orc):
+    stage.entities.append(orc)
+    del stage.entities[0]
+    assert stage.entities.at(2, 3) == []
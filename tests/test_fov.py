@@ -0,0 +1,40 @@
+from ..src import fov
+from ..src import stages
+from ..src import tile
+
+
+def test_initialize_fov__dimensions():
+    m = stages.Stage(width=10, height=5)
+    fov_map = fov.initialize_fov(m)
+    assert fov_map.width == 10
+    assert fov_map.height == 5
+
+
+def test_initialize_fov__all_walls():
+    m = stages.Stage(width=10, height=5)
+    fov_map = fov.initialize_fov(m)
+    assert not fov_map.transparent.any()
+    assert not fov_map.walkable.any()
+
+
+def test_initialize_fov__transposes_tiles():
+    m = stages.Stage(width=10, height=5)
+    m.tiles[7][2].blocks = False
+    m.tiles[7][3].block_sight = False
+    fov_map = fov.initialize_fov(m)
+
+    assert fov_map.walkable[2, 7]
+    assert fov_map.walkable.sum() == 1
+    assert fov_map.transparent[3, 7]
+    assert fov_map.transparent.sum() == 1
+
+
+def test_initialize_fov__matches_every_tile():
+    m = stages.Stage(width=4, height=3)
+    m.tiles = [[tile.Tile(bool((x + y) % 2)) for y in range(3)] for x in range(4)]
+    fov_map = fov.initialize_fov(m)
+
+    for x in range(4):
+        for y in range(3):
+            assert fov_map.walkable[y, x] == (not m.tiles[x][y].blocks)
+            assert fov_map.transparent[y, x] == (not m.tiles[x][y].block_sight)
@@ -70,3 +70,60 @@ def test_Game_init__fov_map():
 def test_Game_init__redraw_is_False():
     g = game.Game()
     assert g.redraw is False
+
+
+""" Tests for Game.restore """
+
+
+def saved_data(g):
+    return {
+        'hero': g.hero,
+        'dungeon': g.dungeon,
+        'msg_log': g.msg_log,
+        'state': States.SHOW_INV,
+        'prev_state': States.PLAYING,
+        'turns': 99,
+        'targeting_item': None,
+        'action_queue': g.action_queue,
+    }
+
+
+def test_Game_restore__takes_saved_state():
+    old = game.Game()
+    g = game.Game.restore(saved_data(old))
+    assert g.hero is old.hero
+    assert g.dungeon is old.dungeon
+    assert g.stage is old.dungeon.get_stage()
+    assert g.state == States.SHOW_INV
+    assert g.turns == 99
+
+
+def test_Game_restore__builds_fov_map():
+    old = game.Game()
+    g = game.Game.restore(saved_data(old))
+    assert g.fov_map is not old.fov_map
+    assert g.fov_map.width == g.stage.width
+    assert g.fov_recompute
+
+
+def test_Game_restore__does_not_generate(mocker):
+    data = saved_data(game.Game())
+    mocker.patch.object(player, 'get_hero')
+    mocker.patch.object(dungeon, 'Dungeon')
+
+    game.Game.restore(data)
+    player.get_hero.assert_not_called()
+    dungeon.Dungeon.assert_not_called()
+
+
+def test_Game_init__same_seed_same_dungeon():
+    g1 = game.Game(seed=11)
+    g2 = game.Game(seed=11)
+    assert (g1.stage.tiles.data == g2.stage.tiles.data).all()
+    assert [(e.name, e.x, e.y) for e in g1.stage.entities] == [(e.name, e.x, e.y) for e in g2.stage.entities]
+
+
+def test_Game_init__rng_shared_with_dungeon():
+    g = game.Game(seed=11)
+    assert g.rng.seed == 11
+    assert g.dungeon.rng is g.rng
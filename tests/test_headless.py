@@ -0,0 +1,58 @@
+import pytest
+from ..src import actions
+from ..src import engine
+from ..src import factory
+from ..src import game
+from ..src import headless
+from ..src import hero_input
+from ..src.config import States
+
+
+@pytest.fixture
+def test_game():
+    return game.Game()
+
+
+def test_NullRenderEngine_render_all__counts_frames(test_game):
+    render_eng = headless.NullRenderEngine()
+    render_eng.render_all(test_game, mouse=None)
+    assert render_eng.frames == 1
+
+
+def test_run__script_exhausted_exits_to_main_menu(test_game, mocker):
+    save = mocker.patch.object(engine, 'save_game')
+    src = hero_input.ScriptedInput([actions.WaitAction()])
+
+    eng = headless.run(test_game, src)
+
+    assert test_game.state == States.MAIN_MENU
+    assert test_game.turns >= 1
+    assert eng.render_eng.frames > 0
+    save.assert_not_called()
+
+
+def wait_policy(g):
+    if g.state == States.HERO_DEAD:
+        return actions.ExitAction(state=g.state)
+    return actions.WaitAction()
+
+
+def test_run__max_turns_stops_loop(test_game):
+    src = hero_input.PolicyInput(wait_policy)
+    headless.run(test_game, src, max_turns=3)
+    assert test_game.turns == 3 or test_game.state == States.MAIN_MENU
+
+
+def test_run__monsters_take_turns(test_game):
+    orc = factory.mk_entity('orc', 0, 0)
+    test_game.stage.entities.append(orc)
+    src = hero_input.PolicyInput(wait_policy)
+
+    headless.run(test_game, src, max_turns=5)
+    assert orc.energymeter.burned_out()
+
+
+def test_Engine_init__default_hero_input_is_tcod(test_game):
+    eng = engine.Engine(test_game, headless.NullRenderEngine())
+    assert isinstance(eng.hero_input, hero_input.TcodInput)
+    assert eng.hero_input.mouse is eng.mouse
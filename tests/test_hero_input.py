@@ -0,0 +1,92 @@
+import io
+import pytest
+import tcod
+from ..src import actions
+from ..src import game
+from ..src import hero_input
+from ..src import input_handling
+from ..src.config import States
+
+
+@pytest.fixture
+def test_game():
+    return game.Game()
+
+
+def key_down(sym, mod=tcod.event.Modifier.NONE):
+    return tcod.event.KeyDown(scancode=0, sym=sym, mod=mod)
+
+
+def test_TcodInput_get_action__key(test_game, mocker):
+    mocker.patch.object(tcod.event, 'wait', return_value=[key_down(tcod.event.KeySym.PERIOD)])
+    src = hero_input.TcodInput(input_handling.MouseState())
+
+    assert isinstance(src.get_action(test_game), actions.WaitAction)
+
+
+def test_TcodInput_get_action__quit_exits(test_game, mocker):
+    mocker.patch.object(tcod.event, 'wait', return_value=[tcod.event.Quit()])
+    src = hero_input.TcodInput(input_handling.MouseState())
+
+    assert isinstance(src.get_action(test_game), actions.ExitAction)
+
+
+def test_TcodInput_get_action__skips_other_events(test_game, mocker):
+    events = [tcod.event.KeyDown(scancode=0, sym=tcod.event.KeySym.LSHIFT, mod=0), key_down(tcod.event.KeySym.I)]
+    mocker.patch.object(tcod.event, 'wait', return_value=events)
+    src = hero_input.TcodInput(input_handling.MouseState())
+
+    assert isinstance(src.get_action(test_game), actions.ShowInvAction)
+
+
+def test_TcodInput_handle_event__mouse_move_redraws(test_game):
+    mouse = input_handling.MouseState()
+    src = hero_input.TcodInput(mouse)
+    event = tcod.event.MouseMotion(position=(3, 4))
+
+    assert isinstance(src.handle_event(test_game, event), actions.NullAction)
+    assert (mouse.cx, mouse.cy) == (3, 4)
+
+
+def test_TcodInput_handle_event__targeting_click(test_game):
+    test_game.state = States.TARGETING
+    src = hero_input.TcodInput(input_handling.MouseState())
+    event = tcod.event.MouseButtonUp(position=(3, 4), button=tcod.event.MouseButton.LEFT)
+
+    assert isinstance(src.handle_event(test_game, event), actions.TargetAction)
+
+
+def test_ScriptedInput_get_action__plays_script_in_order(test_game):
+    wait, pickup = actions.WaitAction(), actions.PickupAction()
+    src = hero_input.ScriptedInput([wait, pickup])
+
+    assert src.get_action(test_game) is wait
+    assert src.get_action(test_game) is pickup
+
+
+def test_ScriptedInput_get_action__exhausted_returns_ExitAction(test_game):
+    src = hero_input.ScriptedInput([])
+    result = src.get_action(test_game)
+
+    assert isinstance(result, actions.ExitAction)
+    assert result.state == States.PLAYING
+
+
+def test_KeyInput_get_action__maps_keys(test_game):
+    src = hero_input.KeyInput(['.', 'i'])
+
+    assert isinstance(src.get_action(test_game), actions.WaitAction)
+    assert isinstance(src.get_action(test_game), actions.ShowInvAction)
+
+
+def test_KeyInput_get_action__reads_lines_from_stream(test_game):
+    src = hero_input.KeyInput(io.StringIO('.\n,\n'))
+
+    assert isinstance(src.get_action(test_game), actions.WaitAction)
+    assert isinstance(src.get_action(test_game), actions.PickupAction)
+    assert isinstance(src.get_action(test_game), actions.ExitAction)
+
+
+def test_PolicyInput_get_action__calls_policy_with_game(test_game):
+    src = hero_input.PolicyInput(lambda g: g.state)
+    assert src.get_action(test_game) == States.PLAYING
@@ -522,3 +522,96 @@ def test_key_to_index__invalid_key__returns_negative1():
 
     result = input_handling.key_to_index('aa')
     assert result == -1
+
+
+""" Tests for process_tcod_event """
+
+
+def key_down(sym, mod=tcod.event.Modifier.NONE):
+    return tcod.event.KeyDown(scancode=0, sym=sym, mod=mod)
+
+
+def test_process_tcod_event__a_returns_a():
+    assert input_handling.process_tcod_event(key_down(tcod.event.KeySym.A)) == 'a'
+
+
+def test_process_tcod_event__shift_a_returns_a():
+    # Like process_tcod_input - shift only changes the stair keys.
+    event = key_down(tcod.event.KeySym.A, tcod.event.Modifier.LSHIFT)
+    assert input_handling.process_tcod_event(event) == 'a'
+
+
+def test_process_tcod_event__shift_i_opens_inventory():
+    event = key_down(tcod.event.KeySym.I, tcod.event.Modifier.LSHIFT)
+    key = input_handling.process_tcod_event(event)
+    assert isinstance(input_handling.handle_keys(States.PLAYING, key), actions.ShowInvAction)
+
+
+def test_process_tcod_event__shift_period_returns_greater_than():
+    event = key_down(tcod.event.KeySym.PERIOD, tcod.event.Modifier.RSHIFT)
+    assert input_handling.process_tcod_event(event) == '>'
+
+
+def test_process_tcod_event__control_x_returns_carrot_x():
+    event = key_down(tcod.event.KeySym.X, tcod.event.Modifier.LCTRL)
+    assert input_handling.process_tcod_event(event) == '^x'
+
+
+def test_process_tcod_event__escape_returns_esc():
+    assert input_handling.process_tcod_event(key_down(tcod.event.KeySym.ESCAPE)) == 'esc'
+
+
+def test_process_tcod_event__alt_enter():
+    event = key_down(tcod.event.KeySym.RETURN, tcod.event.Modifier.LALT)
+    assert input_handling.process_tcod_event(event) == 'alt-enter'
+
+
+def test_process_tcod_event__arrow_returns_movement_key():
+    assert input_handling.process_tcod_event(key_down(tcod.event.KeySym.UP)) == 'k'
+
+
+def test_process_tcod_event__keypad_returns_movement_key():
+    assert input_handling.process_tcod_event(key_down(tcod.event.KeySym.KP_7)) == 'y'
+
+
+def test_process_tcod_event__modifier_alone_returns_None():
+    assert input_handling.process_tcod_event(key_down(tcod.event.KeySym.LSHIFT)) is None
+
+
+def test_process_tcod_event__not_a_key_returns_None():
+    assert input_handling.process_tcod_event(tcod.event.Quit()) is None
+
+
+""" Tests for MouseState """
+
+
+def test_MouseState_update__motion_sets_cell():
+    mouse = input_handling.MouseState()
+    assert mouse.update(tcod.event.MouseMotion(position=(5, 6)))
+    assert (mouse.cx, mouse.cy) == (5, 6)
+
+
+def test_MouseState_update__left_click():
+    mouse = input_handling.MouseState()
+    mouse.update(tcod.event.MouseButtonUp(position=(1, 2), button=tcod.event.MouseButton.LEFT))
+
+    assert mouse.lbutton_pressed
+    assert not mouse.rbutton_pressed
+    assert (mouse.cx, mouse.cy) == (1, 2)
+
+
+def test_MouseState_update__not_mouse_returns_False():
+    mouse = input_handling.MouseState()
+    assert mouse.update(tcod.event.Quit()) is False
+
+
+def test_MouseState_reset__clears_clicks():
+    mouse = input_handling.MouseState()
+    mouse.update(tcod.event.MouseButtonUp(position=(1, 2), button=tcod.event.MouseButton.RIGHT))
+    mouse.reset()
+    assert not mouse.rbutton_pressed
+
+
+def test_event_cell__no_root_console_uses_position():
+    event = tcod.event.MouseMotion(position=(5.7, 6.2))
+    assert input_handling.event_cell(event) == (5, 6)
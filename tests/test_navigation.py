@@ -0,0 +1,178 @@
+import pytest
+from ..src import factory
+from ..src import navigation
+from ..src import player
+from ..src import stages
+from ..src import tile
+
+
+@pytest.fixture
+def open_map():
+    m = stages.Stage(10, 10)
+    m.tiles = [[tile.Tile(False) for y in range(10)] for x in range(10)]
+    return m
+
+
+"""Tests for class NavGraph(object):"""
+
+
+def test_NavGraph_terrain_cost__walls_are_0(open_map):
+    open_map.tiles[3][4].blocks = True
+    cost = open_map.nav.terrain_cost()
+    assert cost[3, 4] == 0
+    assert cost.sum() == 99
+
+
+def test_NavGraph_terrain_cost__cached(open_map):
+    first = open_map.nav.terrain_cost()
+    assert open_map.nav.terrain_cost() is first
+
+
+def test_NavGraph_terrain_cost__rebuilt_on_tile_change(open_map):
+    first = open_map.nav.terrain_cost()
+    open_map.tiles[3][4].blocks = True
+    second = open_map.nav.terrain_cost()
+    assert second is not first
+    assert second[3, 4] == 0
+
+
+def test_NavGraph_terrain_cost__rebuilt_on_dig():
+    m = stages.Stage(10, 10)
+    assert m.nav.terrain_cost().sum() == 0
+    m.dig_h_tunnel(x1=0, x2=4, y=0)
+    assert m.nav.terrain_cost().sum() == 5
+
+
+def test_NavGraph_cost__blocking_entities_are_0(open_map):
+    orc = factory.mk_entity('orc', 2, 2)
+    potion = factory.mk_entity('healing_potion', 3, 3)
+    open_map.entities.extend([orc, potion])
+
+    cost = open_map.nav.cost()
+    assert cost[2, 2] == 0
+    assert cost[3, 3] == 1
+    # The terrain itself is left alone
+    assert open_map.nav.terrain_cost()[2, 2] == 1
+
+
+def test_NavGraph_cost__ignored_entities_stay_walkable(open_map):
+    orc = factory.mk_entity('orc', 2, 2)
+    open_map.entities.append(orc)
+    cost = open_map.nav.cost(ignore=(orc,))
+    assert cost[2, 2] == 1
+
+
+def test_NavGraph_get_path__straight_line(open_map):
+    orc = factory.mk_entity('orc', 0, 0)
+    hero = player.Player(x=3, y=0)
+    open_map.entities.extend([orc, hero])
+
+    path = open_map.nav.get_path(orc, hero)
+    assert path == [(1, 0), (2, 0), (3, 0)]
+
+
+def test_NavGraph_get_path__walls_off_returns_empty(open_map):
+    for y in range(10):
+        open_map.tiles[5][y].blocks = True
+    orc = factory.mk_entity('orc', 0, 0)
+    hero = player.Player(x=9, y=9)
+    open_map.entities.extend([orc, hero])
+
+    assert open_map.nav.get_path(orc, hero) == []
+
+
+def test_NavGraph_get_path__walks_around_blockers(open_map):
+    orc = factory.mk_entity('orc', 0, 0)
+    blocker = factory.mk_entity('troll', 1, 0)
+    hero = player.Player(x=2, y=0)
+    open_map.entities.extend([orc, blocker, hero])
+
+    path = open_map.nav.get_path(orc, hero)
+    assert (1, 0) not in path
+    assert path[-1] == (2, 0)
+
+
+def test_NavGraph_flow_field__goal_is_0(open_map):
+    dist = open_map.nav.flow_field(4, 4)
+    assert dist[4, 4] == 0
+    assert dist[5, 4] == navigation.CARDINAL_STEP
+    assert dist[5, 5] == navigation.DIAGONAL_STEP
+
+
+def test_NavGraph_flow_field__walls_unreachable(open_map):
+    open_map.tiles[0][0].blocks = True
+    dist = open_map.nav.flow_field(4, 4)
+    assert dist[0, 0] == navigation.UNREACHABLE
+
+
+def test_NavGraph_flow_field__cached_for_same_goal(open_map):
+    first = open_map.nav.flow_field(4, 4)
+    assert open_map.nav.flow_field(4, 4) is first
+
+
+def test_NavGraph_flow_field__recomputed_when_goal_moves(open_map):
+    first = open_map.nav.flow_field(4, 4)
+    second = open_map.nav.flow_field(5, 4)
+    assert second is not first
+    assert second[5, 4] == 0
+
+
+def test_NavGraph_flow_field__recomputed_on_terrain_change(open_map):
+    first = open_map.nav.flow_field(4, 4)
+    open_map.tiles[5][4].blocks = True
+    second = open_map.nav.flow_field(4, 4)
+    assert second is not first
+    assert second[5, 4] == navigation.UNREACHABLE
+
+
+def test_NavGraph_descend__steps_toward_target(open_map):
+    orc = factory.mk_entity('orc', 0, 0)
+    hero = player.Player(x=5, y=0)
+    open_map.entities.extend([orc, hero])
+    assert open_map.nav.descend(orc, hero) == (1, 0)
+
+
+def test_NavGraph_descend__skips_blocked_neighbour(open_map):
+    orc = factory.mk_entity('orc', 0, 0)
+    troll = factory.mk_entity('troll', 1, 0)
+    hero = player.Player(x=5, y=0)
+    open_map.entities.extend([orc, troll, hero])
+    assert open_map.nav.descend(orc, hero) == (1, 1)
+
+
+def test_NavGraph_descend__unreachable_returns_None(open_map):
+    for y in range(10):
+        open_map.tiles[5][y].blocks = True
+    orc = factory.mk_entity('orc', 0, 0)
+    hero = player.Player(x=9, y=9)
+    open_map.entities.extend([orc, hero])
+    assert open_map.nav.descend(orc, hero) is None
+
+
+def test_NavGraph_descend__too_far_returns_None():
+    m = stages.Stage(40, 3)
+    m.tiles = [[tile.Tile(False) for y in range(3)] for x in range(40)]
+    orc = factory.mk_entity('orc', 0, 0)
+    hero = player.Player(x=navigation.MAX_PATH_LEN, y=0)
+    m.entities.extend([orc, hero])
+    assert m.nav.descend(orc, hero) is None
+
+
+def test_NavGraph_descend__long_diagonal_path_followed():
+    # 24 diagonal steps cost more than 25 cardinal ones, but it's the steps
+    # that count.
+    steps = navigation.MAX_PATH_LEN - 1
+    m = stages.Stage(steps + 1, steps + 1)
+    m.tiles = [[tile.Tile(False) for y in range(steps + 1)] for x in range(steps + 1)]
+    orc = factory.mk_entity('orc', 0, 0)
+    hero = player.Player(x=steps, y=steps)
+    m.entities.extend([orc, hero])
+    assert m.nav.descend(orc, hero) == (1, 1)
+
+
+def test_too_far__counts_steps():
+    diagonal = (navigation.MAX_PATH_LEN - 1) * navigation.DIAGONAL_STEP
+    cardinal = navigation.MAX_PATH_LEN * navigation.CARDINAL_STEP
+    assert not navigation.too_far(diagonal)
+    assert navigation.too_far(cardinal)
+    assert navigation.too_far(navigation.UNREACHABLE)
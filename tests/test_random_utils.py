@@ -1,3 +1,4 @@
+import random
 import pytest
 from ..src import random_utils
 
@@ -21,6 +22,11 @@ def test_rnd_choice_from_dict():
     assert result in CHOICE_DICT.keys()
 
 
+def test_rnd_choice_from_dict__uses_rng():
+    picks = [random_utils.rnd_choice_from_dict(CHOICE_DICT, random.Random(5)) for _ in range(3)]
+    assert len(set(picks)) == 1
+
+
 # Table for testing from_dungeon_lvl
 TABLE1 = [
     # [value, level]
@@ -0,0 +1,254 @@
+import pytest
+import tcod
+from ..src import config
+from ..src import fov
+from ..src import factory
+from ..src import render_functions
+from ..src import stages
+from ..src.rect import Rect
+
+
+class FakeGame(object):
+    def __init__(self, stage):
+        self.stage = stage
+        self.fov_map = fov.initialize_fov(stage)
+
+
+@pytest.fixture
+def render_eng():
+    # Skip __init__ - it opens a window. The map console is all we draw on.
+    eng = render_functions.RenderEngine.__new__(render_functions.RenderEngine)
+    eng.con = tcod.console.Console(width=20, height=20)
+    eng.tile_state = None
+    eng.tile_layer = None
+    eng.cleared = []
+    eng.drawn = []
+    eng.windows = {}
+    eng.header_heights = {}
+    return eng
+
+
+@pytest.fixture
+def g():
+    stage = stages.Stage(20, 20)
+    stage.dig_room(Rect(0, 0, 10, 10))
+    _game = FakeGame(stage)
+    fov.recompute_fov(_game.fov_map, 4, 4, radius=3)
+    return _game
+
+
+def glyph(render_eng, x, y):
+    return chr(render_eng.con.ch[y, x])
+
+
+"""Tests for RenderEngine.render_tiles"""
+
+
+def test_render_tiles__draws_visible_tiles(render_eng, g):
+    render_eng.render_tiles(g)
+
+    assert glyph(render_eng, 4, 4) == '.'
+    assert glyph(render_eng, 0, 4) == ' '    # Out of the fov radius
+    assert g.stage.tiles.explored[4, 4]
+
+
+def test_render_tiles__walls(render_eng, g):
+    fov.recompute_fov(g.fov_map, 1, 1, radius=3)
+    render_eng.render_tiles(g)
+    assert glyph(render_eng, 0, 0) == '#'
+
+
+def test_render_tiles__only_changed_cells_drawn(render_eng, g):
+    render_eng.render_tiles(g)
+
+    # Unchanged cells aren't written again, so the marker stays.
+    render_eng.con.ch[4, 4] = ord('X')
+    render_eng.render_tiles(g)
+    assert glyph(render_eng, 4, 4) == 'X'
+
+
+def test_render_tiles__newly_explored_cells_drawn(render_eng, g):
+    render_eng.render_tiles(g)
+    render_eng.con.ch[4, 4] = ord('X')
+
+    fov.recompute_fov(g.fov_map, 5, 4, radius=3)
+    render_eng.render_tiles(g)
+
+    assert glyph(render_eng, 8, 4) == '.'
+    assert glyph(render_eng, 4, 4) == 'X'
+
+
+def test_render_tiles__redraws_cleared_entity_cells(render_eng, g):
+    render_eng.render_tiles(g)
+    render_eng.draw_entities([factory.mk_entity('orc', 4, 4)])
+    render_eng.clear_all()
+    assert glyph(render_eng, 4, 4) == ' '
+
+    render_eng.render_tiles(g)
+    assert glyph(render_eng, 4, 4) == '.'
+
+
+def test_invalidate__repaints_everything(render_eng, g):
+    render_eng.render_tiles(g)
+    render_eng.invalidate()
+    assert glyph(render_eng, 4, 4) == ' '
+
+    render_eng.render_tiles(g)
+    assert glyph(render_eng, 4, 4) == '.'
+
+
+def test_render_tiles__in_view_uses_light_colors(render_eng, g):
+    render_eng.render_tiles(g)
+    assert tuple(render_eng.con.fg[4, 4]) == tuple(config.colors['light_ground'])
+
+
+def test_render_tiles__remembered_uses_dark_colors(render_eng, g):
+    render_eng.render_tiles(g)
+
+    fov.recompute_fov(g.fov_map, 8, 8, radius=1)
+    render_eng.render_tiles(g)
+
+    assert glyph(render_eng, 4, 4) == '.'
+    assert tuple(render_eng.con.fg[4, 4]) == tuple(config.colors['dark_ground'])
+
+
+def test_render_tiles__terrain_change_repaints(render_eng, g):
+    render_eng.render_tiles(g)
+    render_eng.con.ch[4, 4] = ord('X')
+
+    g.stage.tiles[9, 9].blocks = True
+    render_eng.render_tiles(g)
+    assert glyph(render_eng, 4, 4) == '.'
+
+
+
+def test_render_tiles__console_bigger_than_stage(render_eng):
+    render_eng.con = tcod.console.Console(width=config.scr_width, height=config.scr_height)
+    stage = stages.Stage(30, 15)
+    stage.dig_room(Rect(0, 0, 10, 10))
+    _game = FakeGame(stage)
+    fov.recompute_fov(_game.fov_map, 4, 4, radius=3)
+
+    render_eng.render_tiles(_game)
+    assert glyph(render_eng, 4, 4) == '.'
+    assert glyph(render_eng, 40, 30) == ' '    # Off the stage
+
+"""Tests for RenderEngine.draw_entities"""
+
+
+def test_draw_entities__stamps_char_and_color(render_eng):
+    orc = factory.mk_entity('orc', 4, 4)
+    render_eng.draw_entities([orc])
+
+    assert glyph(render_eng, 4, 4) == orc.char
+    assert tuple(render_eng.con.fg[4, 4]) == tuple(orc.color)
+
+
+def test_draw_entities__last_on_tile_drawn(render_eng):
+    potion = factory.mk_entity('healing_potion', 4, 4)
+    orc = factory.mk_entity('orc', 4, 4)
+    render_eng.draw_entities([potion, orc])
+
+    assert glyph(render_eng, 4, 4) == orc.char
+
+
+def test_clear_all__erases_drawn_entities(render_eng):
+    render_eng.draw_entities([factory.mk_entity('orc', 4, 4), factory.mk_entity('orc', 6, 2)])
+    render_eng.clear_all()
+
+    assert glyph(render_eng, 4, 4) == ' '
+    assert glyph(render_eng, 6, 2) == ' '
+    assert render_eng.cleared == [(4, 4), (6, 2)]
+    assert render_eng.drawn == []
+
+
+"""Tests for RenderEngine.render_main_menu"""
+
+
+@pytest.fixture
+def menu_eng(render_eng):
+    render_eng.con = tcod.console.Console(width=config.scr_width, height=config.scr_height)
+    render_eng.root = tcod.console.Console(width=config.scr_width, height=config.scr_height)
+    render_eng.menu_con = None
+    return render_eng
+
+
+@pytest.fixture
+def menu_img():
+    return tcod.image.Image(config.scr_width * 2, config.scr_height * 2)
+
+
+def test_render_main_menu__draws_on_root(menu_eng, menu_img):
+    menu_eng.render_main_menu(menu_img)
+    assert (menu_eng.root.rgb == menu_eng.menu_con.rgb).all()
+
+
+def test_render_main_menu__only_built_once(menu_eng, menu_img, mocker):
+    spy = mocker.spy(menu_eng, 'mk_main_menu')
+    menu_eng.render_main_menu(menu_img)
+    menu_eng.render_main_menu(menu_img)
+    assert spy.call_count == 1
+
+
+def test_render_main_menu__redraws_over_root(menu_eng, menu_img):
+    menu_eng.render_main_menu(menu_img)
+    menu_eng.root.clear()
+    menu_eng.render_main_menu(menu_img)
+    assert (menu_eng.root.rgb == menu_eng.menu_con.rgb).all()
+
+
+def test_invalidate_menu__rebuilds_menu(menu_eng, menu_img):
+    menu_eng.render_main_menu(menu_img)
+    old = menu_eng.menu_con
+    menu_eng.invalidate_menu()
+    menu_eng.render_main_menu(menu_img)
+    assert menu_eng.menu_con is not old
+
+
+"""Tests for RenderEngine.get_window and header_height"""
+
+
+def test_get_window__size(render_eng):
+    window = render_eng.get_window(30, 10)
+    assert (window.width, window.height) == (30, 10)
+
+
+def test_get_window__reuses_same_size(render_eng):
+    assert render_eng.get_window(30, 10) is render_eng.get_window(30, 10)
+
+
+def test_get_window__different_sizes(render_eng):
+    assert render_eng.get_window(30, 10) is not render_eng.get_window(30, 11)
+
+
+def test_get_window__reused_window_is_blank(render_eng):
+    window = render_eng.get_window(30, 10)
+    window.print(x=0, y=0, string='hello', fg=(255, 0, 0), bg=(0, 0, 255))
+    window = render_eng.get_window(30, 10)
+    assert (window.ch == ord(' ')).all()
+    assert (window.bg == 0).all()
+
+
+def test_header_height__wraps(render_eng):
+    assert render_eng.header_height('one two three', 5) == 3
+
+
+def test_header_height__memoized(render_eng, mocker):
+    spy = mocker.spy(tcod, 'console_get_height_rect')
+    render_eng.header_height('header', 20)
+    render_eng.header_height('header', 20)
+    assert spy.call_count == 1
+
+
+def test_render_menu__reuses_window(menu_eng, mocker):
+    spy = mocker.spy(tcod.console, 'Console')
+    menu_eng.render_menu('header', ['a', 'b'], 20)
+    menu_eng.render_menu('header', ['a', 'b'], 20)
+    assert spy.call_count == 1
+
+
+def test_render_menu__draws_options(menu_eng):
+    menu_eng.render_menu('header', ['apple'], 20)
+    x = int(config.scr_width / 2 - 20 / 2)
+    row = ''.join(chr(c) for c in menu_eng.root.ch[6, x:x + 5])
+    assert row == 'apple'
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from ..src import entity
+from ..src import factory
+from ..src import render_index
+from ..src import stages
+from ..src import stairs
+from ..src.config import RenderOrder
+
+
+@pytest.fixture
+def index():
+    return render_index.RenderIndex(10, 10)
+
+
+@pytest.fixture
+def visible():
+    mask = np.zeros((10, 10), dtype=bool)
+    mask[0:5, 0:5] = True
+    return mask
+
+
+@pytest.fixture
+def orc():
+    return factory.mk_entity('orc', 1, 1)
+
+
+@pytest.fixture
+def potion():
+    return factory.mk_entity('healing_potion', 1, 1)
+
+
+"""Tests for class RenderIndex(object):"""
+
+
+def test_RenderIndex_add__counts_tile(index, orc):
+    index.add(orc)
+    assert orc in index
+    assert index.counts[RenderOrder.ACTOR][1, 1] == 1
+
+
+def test_RenderIndex_add__no_render_order_skipped(index):
+    e = entity.Entity(x=1, y=1)
+    index.add(e)
+    assert len(index) == 0
+
+
+def test_RenderIndex_remove(index, orc):
+    index.add(orc)
+    index.remove(orc)
+
+    assert orc not in index
+    assert index.counts[RenderOrder.ACTOR][1, 1] == 0
+    assert index.cells[RenderOrder.ACTOR] == {}
+
+
+def test_RenderIndex_in_view__render_order(index, visible, orc, potion):
+    index.add(orc)
+    index.add(potion)
+    assert index.in_view(visible, visible) == [potion, orc]
+
+
+def test_RenderIndex_in_view__out_of_view_skipped(index, visible):
+    index.add(factory.mk_entity('orc', 8, 8))
+    assert index.in_view(visible, visible) == []
+
+
+def test_RenderIndex_in_view__explored_stairs(index, visible):
+    stair = stairs.StairDown(8, 8, floor=1)
+    index.add(stair)
+    explored = visible.copy()
+    explored[8, 8] = True
+
+    assert index.in_view(visible, explored) == [stair]
+
+
+def test_RenderIndex_update__moved(index, visible, orc):
+    index.add(orc)
+    orc.components['x'] = 8
+    index.update(orc)
+
+    assert index.in_view(visible, visible) == []
+    assert index.counts[RenderOrder.ACTOR][8, 1] == 1
+
+
+def test_Stage_render_index__follows_corpse_conversion(orc, potion):
+    stage = stages.Stage(10, 10)
+    stage.entities.extend([orc, potion])
+
+    orc.render_order = RenderOrder.CORPSE
+    assert orc in stage.render_index.cells[RenderOrder.CORPSE][(1, 1)]
+    assert stage.render_index.counts[RenderOrder.ACTOR][1, 1] == 0
+
+
+def test_Stage_render_index__follows_moves(orc):
+    stage = stages.Stage(10, 10)
+    stage.entities.append(orc)
+    orc.move(1, 0)
+
+    assert stage.render_index.positions[orc] == (RenderOrder.ACTOR, 2, 1)
+
+
+def test_Stage_render_index__removed_entity(orc):
+    stage = stages.Stage(10, 10)
+    stage.entities.append(orc)
+    stage.entities.remove(orc)
+    assert orc not in stage.render_index
@@ -0,0 +1,54 @@
+import random
+from ..src import rng
+
+
+def test_derive_seed__same_keys_same_seed():
+    assert rng.derive_seed(1, 2, 'stage') == rng.derive_seed(1, 2, 'stage')
+
+
+def test_derive_seed__different_keys():
+    seeds = {rng.derive_seed(1, 2, 'stage'), rng.derive_seed(1, 3, 'stage'), rng.derive_seed(1, 2, 'play')}
+    assert len(seeds) == 3
+
+
+def test_derive_seed__64_bits():
+    assert 0 <= rng.derive_seed(5) < 2 ** 64
+
+
+def test_RNG_init__seed():
+    assert rng.RNG(42).seed == 42
+
+
+def test_RNG_init__no_seed_follows_random_module():
+    random.seed(3)
+    a = rng.RNG().seed
+    random.seed(3)
+    assert rng.RNG().seed == a
+
+
+def test_RNG_stream__cached():
+    r = rng.RNG(1)
+    assert r.stream(1, rng.STAGE) is r.stream(1, rng.STAGE)
+
+
+def test_RNG_stream__same_seed_same_numbers():
+    a = rng.RNG(1).stream(2, rng.STAGE)
+    b = rng.RNG(1).stream(2, rng.STAGE)
+    assert [a.random() for _ in range(5)] == [b.random() for _ in range(5)]
+
+
+def test_RNG_stream__streams_are_independent():
+    r1 = rng.RNG(1)
+    r1.stream(1, rng.PLAY).random()
+    expected = r1.stream(2, rng.STAGE).random()
+
+    # Drawing from another stream first doesn't change this one.
+    r2 = rng.RNG(1)
+    for _ in range(10):
+        r2.stream(1, rng.PLAY).random()
+    assert r2.stream(2, rng.STAGE).random() == expected
+
+
+def test_RNG_derive__matches_stream():
+    r = rng.RNG(9)
+    assert random.Random(r.derive(4, rng.STAGE)).random() == r.stream(4, rng.STAGE).random()
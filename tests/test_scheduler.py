@@ -0,0 +1,157 @@
+import pytest
+from ..src import components
+from ..src import entity
+from ..src import scheduler
+from ..src import stages
+
+
+def mk_actor(name, threshold):
+    return entity.Entity(
+        x=0, y=0, name=name, ai=True,
+        energymeter=components.EnergyMeter(threshold=threshold)
+    )
+
+
+@pytest.fixture
+def stage():
+    return stages.Stage(10, 10)
+
+
+def run(sched, stage, turns):
+    """Pops actors until the given turn, spending their energy like
+        Engine.actor_turn. Returns a list of (turn, name) for each action.
+    """
+    log = []
+    while sched.peek(stage) < turns:
+        turn, e = sched.pop(stage)
+        while not e.energymeter.burned_out():
+            e.energymeter.burn_turn()
+            log.append((turn, e.name))
+        sched.push(e)
+    return log
+
+
+def round_robin(actors, turns, energy=100):
+    """The old Engine loop: every actor gets energy every turn."""
+    log = []
+    for turn in range(turns):
+        for e in actors:
+            e.energymeter.add_energy(energy)
+            while not e.energymeter.burned_out():
+                e.energymeter.burn_turn()
+                log.append((turn, e.name))
+    return log
+
+
+"""Tests for class Scheduler(object):"""
+
+
+def test_Scheduler_init__empty(stage):
+    sched = scheduler.Scheduler()
+    assert len(sched) == 0
+    assert sched.peek(stage) is None
+    assert sched.pop(stage) is None
+
+
+def test_Scheduler_peek__schedules_stage_actors(stage):
+    stage.entities.append(mk_actor('orc', 100))
+    sched = scheduler.Scheduler()
+
+    assert sched.peek(stage) == 0
+    assert len(sched) == 1
+
+
+def test_Scheduler_peek__slow_actor_ready_later(stage):
+    stage.entities.append(mk_actor('troll', 200))
+    sched = scheduler.Scheduler()
+    assert sched.peek(stage) == 1
+
+
+def test_Scheduler_pop__credits_energy(stage):
+    troll = mk_actor('troll', 200)
+    stage.entities.append(troll)
+    sched = scheduler.Scheduler()
+
+    assert sched.pop(stage) == (1, troll)
+    assert troll.energymeter.energy == 200
+
+
+def test_Scheduler_pop__same_turn_in_stage_order(stage):
+    a, b = mk_actor('a', 100), mk_actor('b', 100)
+    stage.entities.extend([a, b])
+    sched = scheduler.Scheduler()
+
+    assert sched.pop(stage) == (0, a)
+    sched.push(a)
+    assert sched.pop(stage) == (0, b)
+
+
+def test_Scheduler__matches_round_robin(stage):
+    speeds = [('spider', 75), ('hero', 100), ('orc', 110), ('troll', 200)]
+    stage.entities.extend(mk_actor(n, t) for n, t in speeds)
+
+    expected = round_robin([mk_actor(n, t) for n, t in speeds], turns=30)
+    assert run(scheduler.Scheduler(), stage, turns=30) == expected
+
+
+def test_Scheduler__removed_actor_is_dropped(stage):
+    a, b = mk_actor('a', 100), mk_actor('b', 100)
+    stage.entities.extend([a, b])
+    sched = scheduler.Scheduler()
+    sched.peek(stage)
+
+    stage.entities.remove(b)
+    assert [name for _, name in run(sched, stage, turns=3)] == ['a', 'a', 'a']
+
+
+def test_Scheduler__actor_losing_ai_is_dropped(stage):
+    a = mk_actor('a', 100)
+    stage.entities.append(a)
+    sched = scheduler.Scheduler()
+    sched.peek(stage)
+
+    a.rm_comp('ai')
+    assert sched.peek(stage) is None
+
+
+def test_Scheduler__actor_joining_mid_turn_waits_for_next_turn(stage):
+    a = mk_actor('a', 100)
+    stage.entities.append(a)
+    sched = scheduler.Scheduler()
+
+    turn, _ = sched.pop(stage)
+    sched.push(a)
+    b = mk_actor('b', 100)
+    stage.entities.append(b)
+
+    assert sched.pop(stage) == (1, a)
+    sched.push(a)
+    assert sched.pop(stage) == (1, b)
+    assert b.energymeter.energy == 100
+
+
+def test_Scheduler__new_stage_rebuilds_schedule(stage):
+    hero = mk_actor('hero', 100)
+    stage.entities.append(hero)
+    sched = scheduler.Scheduler()
+    sched.pop(stage)
+    hero.energymeter.burn_turn()
+    sched.push(hero)
+
+    orc = mk_actor('orc', 100)
+    next_stage = stages.Stage(10, 10)
+    next_stage.entities.extend([orc, hero])
+
+    assert sched.pop(next_stage) == (1, orc)
+    assert len(sched) == 1
+
+
+def test_Scheduler_flush__credits_waiting_actors(stage):
+    troll = mk_actor('troll', 1000)
+    stage.entities.append(troll)
+    sched = scheduler.Scheduler(now=0)
+    sched.peek(stage)
+
+    sched.now = 4
+    sched.flush()
+    assert troll.energymeter.energy == 400
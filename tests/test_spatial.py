@@ -0,0 +1,109 @@
+import pytest
+from ..src import factory
+from ..src import spatial
+
+
+@pytest.fixture
+def index():
+    return spatial.SpatialIndex(10, 10)
+
+
+@pytest.fixture
+def orc():
+    return factory.mk_entity('orc', 2, 3)
+
+
+@pytest.fixture
+def potion():
+    return factory.mk_entity('healing_potion', 2, 3)
+
+
+"""Tests for class SpatialIndex(object):"""
+
+
+def test_SpatialIndex_init(index):
+    assert len(index) == 0
+    assert index.blockers.shape == (10, 10)
+    assert not index.blockers.any()
+
+
+def test_SpatialIndex_add(index, orc):
+    index.add(orc)
+    assert orc in index
+    assert index.at(2, 3) == [orc]
+    assert index.is_occupied(2, 3)
+
+
+def test_SpatialIndex_add__blocker_counted(index, orc):
+    index.add(orc)
+    assert index.blockers[2, 3] == 1
+    assert index.blocked(2, 3)
+
+
+def test_SpatialIndex_add__non_blocker_not_counted(index, potion):
+    index.add(potion)
+    assert index.blockers[2, 3] == 0
+    assert index.blocked(2, 3) is False
+
+
+def test_SpatialIndex_remove(index, orc):
+    index.add(orc)
+    index.remove(orc)
+    assert orc not in index
+    assert index.at(2, 3) == []
+    assert index.is_occupied(2, 3) is False
+    assert index.blockers[2, 3] == 0
+
+
+def test_SpatialIndex_update__moved(index, orc):
+    index.add(orc)
+    orc.x, orc.y = 5, 5
+    index.update(orc)
+    assert index.at(2, 3) == []
+    assert index.at(5, 5) == [orc]
+    assert index.blockers[2, 3] == 0
+    assert index.blockers[5, 5] == 1
+
+
+def test_SpatialIndex_update__stopped_blocking(index, orc):
+    index.add(orc)
+    orc.blocks = False
+    index.update(orc)
+    assert index.at(2, 3) == [orc]
+    assert index.blockers[2, 3] == 0
+
+
+def test_SpatialIndex_at__multiple(index, orc, potion):
+    index.add(orc)
+    index.add(potion)
+    assert index.at(2, 3) == [orc, potion]
+
+
+def test_SpatialIndex_blocker_at(index, orc, potion):
+    index.add(orc)
+    index.add(potion)
+    assert index.blocker_at(2, 3) is orc
+
+
+def test_SpatialIndex_blocker_at__no_blocker_returns_None(index, potion):
+    index.add(potion)
+    assert index.blocker_at(2, 3) is None
+    assert index.blocker_at(0, 0) is None
+
+
+def test_SpatialIndex_blocked__out_of_bounds_returns_False(index):
+    assert index.blocked(20, 20) is False
+
+
+def test_SpatialIndex_occupied():
+    idx = spatial.SpatialIndex(5, 5)
+    idx.add(factory.mk_entity('orc', 1, 2))
+    idx.add(factory.mk_entity('healing_potion', 3, 4))
+    mask = idx.occupied()
+    assert mask.shape == (5, 5)
+    assert mask.sum() == 2
+    assert mask[1, 2] and mask[3, 4]
+
+
+def test_SpatialIndex_occupied__empty():
+    assert not spatial.SpatialIndex(5, 5).occupied().any()
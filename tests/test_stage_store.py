@@ -0,0 +1,132 @@
+import pickle
+import numpy as np
+import pytest
+from ..src import factory
+from ..src import game
+from ..src import stage_store
+from ..src import tile
+
+
+def test_pack_tiles__roundtrip():
+    tiles = tile.TileGrid(7, 5)
+    tiles.blocks[1:4, 2] = False
+    tiles.block_sight[2, 1:3] = False
+    tiles.explored[0, :] = True
+
+    result = stage_store.unpack_tiles(stage_store.pack_tiles(tiles), 7, 5)
+    assert np.array_equal(result.data, tiles.data)
+
+
+def test_pack_tiles__one_bit_per_tile():
+    tiles = tile.TileGrid(16, 16)
+    assert len(stage_store.pack_tiles(tiles)) == 16 * 16 * 3 // 8
+
+
+def test_unpack_tiles__wrong_size__raises_ValueError():
+    buf = stage_store.pack_tiles(tile.TileGrid(7, 5))
+
+    with pytest.raises(ValueError):
+        stage_store.unpack_tiles(buf[:-1], 7, 5)
+
+
+def test_unpickle_entities__damaged__raises_ValueError():
+    with pytest.raises(ValueError):
+        stage_store.unpickle_entities(b'\xff' * 5, None)
+
+
+def test_check_pickle__huge_memo_index__raises_ValueError():
+    # LONG_BINPUT 2**31 - 1 would have the unpickler grow its memo to match.
+    buf = b'\x80\x04N' + b'r' + (2 ** 31 - 1).to_bytes(4, 'little') + b'.'
+
+    with pytest.raises(ValueError):
+        stage_store.check_pickle(buf)
+
+
+def test_check_pickle__truncated__raises_ValueError():
+    buf = pickle.dumps(bytearray(100), protocol=5)
+
+    with pytest.raises(ValueError):
+        stage_store.check_pickle(buf[:-20])
+
+
+def test_load_stage__not_a_list__raises_ValueError():
+    g = game.Game()
+    info = stage_store.stage_record(g.stage)
+
+    with pytest.raises(ValueError):
+        stage_store.load_stage(info, stage_store.pack_tiles(g.stage.tiles), pickle.dumps(5), g.hero)
+
+
+def test_load_stage__not_entities__raises_ValueError():
+    g = game.Game()
+    info = stage_store.stage_record(g.stage)
+
+    with pytest.raises(ValueError):
+        stage_store.load_stage(info, stage_store.pack_tiles(g.stage.tiles), pickle.dumps([1, 2]), g.hero)
+
+
+def test_load_stage__entity_off_stage__raises_ValueError():
+    g = game.Game()
+    info = stage_store.stage_record(g.stage)
+    orc = factory.mk_entity('orc', g.stage.width, 0)
+    buf = stage_store.pickle_entities([orc], g.hero)
+
+    with pytest.raises(ValueError):
+        stage_store.load_stage(info, stage_store.pack_tiles(g.stage.tiles), buf, g.hero)
+
+
+def test_pickle_entities__hero_by_reference():
+    g = game.Game()
+    buf = stage_store.pickle_entities(g.stage.entities, g.hero)
+    # The hero's components aren't written again in the stage's entities.
+    assert len(buf) < len(pickle.dumps(list(g.stage.entities)))
+
+    entities = stage_store.unpickle_entities(buf, g.hero)
+    assert g.hero in entities
+
+
+def test_SpillFile_spill__roundtrip():
+    g = game.Game()
+    g.dungeon.mk_next_stage()
+    stage = g.dungeon.stages[1]
+
+    spilled = stage_store.SpillFile().spill(stage, g.hero)
+    assert isinstance(spilled, stage_store.SavedStage)
+    assert spilled.dungeon_lvl == 2
+
+    loaded = spilled.load()
+    assert np.array_equal(loaded.tiles.data, stage.tiles.data)
+    assert [(e.name, e.x, e.y) for e in loaded.entities] == [(e.name, e.x, e.y) for e in stage.entities]
+
+
+def test_SpillFile_spill__earlier_stages_still_readable():
+    g = game.Game()
+    g.dungeon.mk_next_stage()
+    spill_file = stage_store.SpillFile()
+
+    first = spill_file.spill(g.dungeon.stages[0], g.hero)
+    spill_file.spill(g.dungeon.stages[1], g.hero)
+    assert np.array_equal(first.load().tiles.data, g.dungeon.stages[0].tiles.data)
+
+
+def test_SpillFile_release__space_reused():
+    g = game.Game()
+    spill_file = stage_store.SpillFile()
+
+    saved = spill_file.spill(g.stage, g.hero)
+    size = spill_file.size
+    spill_file.release(saved)
+
+    spill_file.spill(g.stage, g.hero)
+    assert spill_file.size == size
+
+
+def test_SpillFile_release__merges_neighbours():
+    g = game.Game()
+    spill_file = stage_store.SpillFile()
+
+    first = spill_file.spill(g.stage, g.hero)
+    second = spill_file.spill(g.stage, g.hero)
+    spill_file.release(second)
+    spill_file.release(first)
+    assert spill_file.free == [(0, spill_file.size)]
@@ -1,11 +1,15 @@
+import pickle
+import random
 import pytest
 from pytest_mock import mocker
 
 from ..src import config
 from ..src import entity
+from ..src import factory
 from ..src import player
 from ..src import rect
 from ..src import stages
+from ..src import tile
 
 DEFAULT_LENGTH = 50
 INVALID_LENGTH = 2
@@ -79,6 +83,15 @@ def test_Stage_initialize_tiles():
     assert all(t for t in result)
 
 
+def test_Stage_tiles__list_of_tiles_is_converted():
+    m = stages.Stage(width=3, height=3)
+    m.tiles = [[tile.Tile(False) for y in range(5)] for x in range(4)]
+    assert isinstance(m.tiles, tile.TileGrid)
+    assert m.width == 4
+    assert m.height == 5
+    assert m.blocks(3, 4) is False
+
+
 def test_Stage_is_blocked_wall_returns_true():
     m = stages.Stage(width=3, height=3)
     result = m.blocks(0, 0)
@@ -218,6 +231,46 @@ def test_Stage_dig_v_tunnel_reversed_parameters():
     assert m.tiles[0][8].blocks is False
     assert m.tiles[0][9].blocks is True
 
+def test_Stage_dig_h_tunnel__block_sight():
+    m = stages.Stage(width=10, height=10)
+    m.dig_h_tunnel(x1=2, x2=5, y=3)
+    assert not m.tiles.block_sight[2:6, 3].any()
+    assert m.tiles.block_sight[6, 3]
+
+
+def test_Stage_dig_v_tunnel__bumps_tile_version():
+    m = stages.Stage(width=10, height=10)
+    version = m.tiles.version
+    m.dig_v_tunnel(y1=0, y2=8, x=0)
+    assert m.tiles.version > version
+
+
+def test_Stage_mk_stage__rooms_dont_intersect():
+    m = stages.Stage(width=50, height=50)
+    m.mk_stage()
+    for i, room in enumerate(m.rooms):
+        for other in m.rooms[i + 1:]:
+            assert not room.intersect(other)
+
+
+def test_Stage_mk_stage__same_rng_seed_same_stage():
+    m1 = stages.Stage(width=50, height=50, rng=random.Random(4))
+    m2 = stages.Stage(width=50, height=50, rng=random.Random(4))
+    m1.mk_stage()
+    m2.mk_stage()
+    assert (m1.tiles.data == m2.tiles.data).all()
+
+
+def test_Stage_populate__same_rng_seed_same_entities():
+    stages_made = []
+    for _ in range(2):
+        m = stages.Stage(width=50, height=50, rng=random.Random(4))
+        m.mk_stage()
+        m.populate()
+        stages_made.append([(e.name, e.x, e.y) for e in m.entities])
+    assert stages_made[0] == stages_made[1]
+
+
 def test_Stage_mk_stage__has_at_least_2_rooms():
     m = stages.Stage(width=50, height=50)
     m.mk_stage()
@@ -290,6 +343,71 @@ def test_Stage_is_occupied__occupied_return_True(hero):
     assert m.is_occupied(x, y) is True
 
 
+def test_Stage_is_occupied__entity_moved(hero):
+    m = stages.Stage(width=10, height=10)
+    m.entities.append(hero)
+    hero.move(1, 1)
+    assert m.is_occupied(0, 0) is False
+    assert m.is_occupied(1, 1) is True
+
+
+def test_Stage_is_occupied__entity_xy_set(hero):
+    m = stages.Stage(width=10, height=10)
+    m.entities.append(hero)
+    hero.x, hero.y = 4, 5
+    assert m.is_occupied(0, 0) is False
+    assert m.is_occupied(4, 5) is True
+
+
+def test_Stage_is_occupied__entity_removed(hero):
+    m = stages.Stage(width=10, height=10)
+    m.entities.append(hero)
+    m.entities.remove(hero)
+    assert m.is_occupied(0, 0) is False
+
+
+def test_Stage_entities_at(hero):
+    m = stages.Stage(width=10, height=10)
+    potion = factory.mk_entity('healing_potion', 0, 0)
+    m.entities.extend([hero, potion])
+    assert m.entities_at(0, 0) == [hero, potion]
+    assert m.entities_at(1, 1) == []
+
+
+def test_Stage_entities__assigning_list_reindexes(hero):
+    m = stages.Stage(width=10, height=10)
+    m.entities = [hero]
+    assert m.is_occupied(0, 0)
+
+
+def test_Stage_tiles__replacing_tiles_keeps_index(hero):
+    m = stages.Stage(width=3, height=3)
+    m.entities.append(hero)
+    m.tiles = [[tile.Tile(False) for y in range(10)] for x in range(10)]
+    hero.x, hero.y = 8, 8
+    assert m.get_blocker_at_loc(8, 8) is hero
+
+
+def test_Stage_pickle__rebuilds_index(hero):
+    m = stages.Stage(width=10, height=10)
+    m.entities.append(hero)
+    m2 = pickle.loads(pickle.dumps(m))
+    hero2 = m2.entities[0]
+
+    assert m2.is_occupied(0, 0)
+    hero2.move(1, 1)
+    assert m2.is_occupied(1, 1)
+
+
+def test_Stage_pickle__layers_not_saved():
+    m = stages.Stage(width=10, height=10)
+    m.layers.get()
+    m2 = pickle.loads(pickle.dumps(m))
+
+    assert m2.layers.stage is m2
+    assert m2.layers.lit is None
+
+
 def test_get_random_open_spot__all_wall_returns_None():
     m = stages.Stage(width=10, height=10)
     assert m.get_random_open_spot() is None
@@ -301,6 +419,47 @@ def test_get_random_open_spot__single_spot():
     assert m.get_random_open_spot() == (0, 0)
 
 
+def test_get_random_open_spot__skips_occupied():
+    m = stages.Stage(width=10, height=10)
+    m.tiles[0][0].blocks = False
+    m.tiles[1][0].blocks = False
+    m.entities.append(factory.mk_entity('orc', 0, 0))
+    assert m.get_random_open_spot() == (1, 0)
+
+
+def test_get_random_open_spot__all_occupied_returns_None():
+    m = stages.Stage(width=10, height=10)
+    m.tiles[0][0].blocks = False
+    m.entities.append(factory.mk_entity('orc', 0, 0))
+    assert m.get_random_open_spot() is None
+
+
+def test_Stage_floor_cells():
+    m = stages.Stage(width=10, height=10)
+    m.dig_h_tunnel(x1=2, x2=4, y=3)
+    assert sorted(map(tuple, m.floor_cells())) == [(2, 3), (3, 3), (4, 3)]
+
+
+def test_Stage_floor_cells__cached():
+    m = stages.Stage(width=10, height=10)
+    m.dig_h_tunnel(x1=2, x2=4, y=3)
+    assert m.floor_cells() is m.floor_cells()
+
+
+def test_Stage_floor_cells__updated_after_dig():
+    m = stages.Stage(width=10, height=10)
+    m.floor_cells()
+    m.dig_v_tunnel(y1=0, y2=1, x=5)
+    assert sorted(map(tuple, m.floor_cells())) == [(5, 0), (5, 1)]
+
+
+def test_Stage_floor_cells__updated_after_new_tiles():
+    m = stages.Stage(width=10, height=10)
+    m.floor_cells()
+    m.tiles = tile.TileGrid(10, 10, blocks=False)
+    assert len(m.floor_cells()) == 100
+
+
 def test_Stage_get_random_non_wall_loc__default_stage_returns_None():
     m = stages.Stage(width=10, height=10)
     # There should be no non-Wall tiles in a default stage
@@ -419,6 +578,14 @@ def test_Stage_get_blocker_at_loc__blocked_returns_entity():
     assert result == monster
 
 
+def test_Stage_get_blocker_at_loc__stopped_blocking_returns_None():
+    m = stages.Stage(width=10, height=10)
+    orc = factory.mk_entity('orc', 1, 1)
+    m.entities.append(orc)
+    orc.blocks = False
+    assert m.get_blocker_at_loc(1, 1) is None
+
+
 def test_Stage_get_blocker_at_loc__not_blocked_returns_None():
     m = stages.Stage(width=50, height=50)
     result = m.get_blocker_at_loc(0, 0)
@@ -33,3 +33,54 @@ def test_Tile_init__block_sight_False():
 def test_Tile_init__explored_is_False():
     t = tile.Tile(blocks=True)
     assert t.explored is False
+
+
+"""Tests for class TileGrid(object):"""
+
+
+def test_TileGrid_init__all_walls():
+    g = tile.TileGrid(3, 4)
+    assert g.blocks.shape == (3, 4)
+    assert g.blocks.all()
+    assert g.block_sight.all()
+    assert not g.explored.any()
+
+
+def test_TileGrid_init__blocks_False():
+    g = tile.TileGrid(3, 4, blocks=False)
+    assert not g.blocks.any()
+    assert not g.block_sight.any()
+
+
+def test_TileGrid_len_is_width():
+    g = tile.TileGrid(3, 4)
+    assert len(g) == 3
+    assert len(g[0]) == 4
+
+
+def test_TileGrid_from_tiles():
+    tiles = [[tile.Tile(False) for y in range(4)] for x in range(3)]
+    tiles[1][2].blocks = True
+    g = tile.TileGrid.from_tiles(tiles)
+    assert g.width == 3
+    assert g.height == 4
+    assert g.blocks[1, 2]
+    assert g.blocks.sum() == 1
+    assert not g.block_sight.any()
+
+
+def test_TileView__reads_arrays():
+    g = tile.TileGrid(3, 3)
+    g.blocks[1, 2] = False
+    assert g[1][2].blocks is False
+    assert g[1, 2].blocks is False
+    assert g[1][2].block_sight is True
+
+
+def test_TileView__writes_arrays():
+    g = tile.TileGrid(3, 3)
+    g[1][2].blocks = False
+    g[1][2].explored = True
+    assert not g.blocks[1, 2]
+    assert g.explored[1, 2]
+    assert g.explored.sum() == 1
@@ -0,0 +1,54 @@
+import pytest
+from ..src import config
+from ..src import stages
+from ..src import tile_layers
+from ..src.rect import Rect
+
+
+@pytest.fixture
+def stage():
+    s = stages.Stage(10, 10)
+    s.dig_room(Rect(0, 0, 5, 5))
+    return s
+
+
+"""Tests for class TileLayers(object):"""
+
+
+def test_TileLayers_get__indexed_y_x(stage):
+    stage = stages.Stage(10, 20)
+    lit, dark = stage.layers.get()
+    assert lit.shape == dark.shape == (20, 10)
+
+
+def test_TileLayers_get__glyphs(stage):
+    lit, dark = stage.layers.get()
+    assert chr(lit['ch'][0, 0]) == chr(dark['ch'][0, 0]) == '#'
+    assert chr(lit['ch'][2, 2]) == chr(dark['ch'][2, 2]) == '.'
+
+
+def test_TileLayers_get__colors(stage):
+    lit, dark = stage.layers.get()
+    assert tuple(lit['fg'][0, 0]) == tuple(config.colors['light_wall'])
+    assert tuple(lit['fg'][2, 2]) == tuple(config.colors['light_ground'])
+    assert tuple(dark['fg'][0, 0]) == tuple(config.colors['dark_wall'])
+    assert tuple(dark['fg'][2, 2]) == tuple(config.colors['dark_ground'])
+
+
+def test_TileLayers_get__cached(stage):
+    lit, _ = stage.layers.get()
+    assert stage.layers.get()[0] is lit
+
+
+def test_TileLayers_get__rebuilt_when_tiles_change(stage):
+    lit, _ = stage.layers.get()
+    stage.tiles[2, 2].block_sight = True
+
+    lit2, _ = stage.layers.get()
+    assert lit2 is not lit
+    assert chr(lit2['ch'][2, 2]) == '#'
+
+
+def test_mk_layer__background_is_black(stage):
+    layer = tile_layers.mk_layer(stage.tiles.block_sight.T, (1, 2, 3), (4, 5, 6))
+    assert not layer['bg'].any()